@@ -4,9 +4,13 @@ Simulates multiple users interacting with the same agent simultaneously
 """
 
 import asyncio
+import sys
 from agents import Agent, Runner
 from monkai_trace.integrations.openai_agents import MonkAIRunHooks
 
+_BANNER = "=" * 60
+_WIDE_BANNER = "=" * 70
+
 
 class CustomerSupportBot:
     """Simulates a customer support bot handling multiple users"""
@@ -25,20 +29,20 @@ class CustomerSupportBot:
     
     async def handle_message(self, user_id: str, message: str):
         """Handle message from a specific user"""
-        # Set user ID to ensure session isolation
+        # Set user ID to ensure session isolation (scoped to this task, so
+        # concurrent messages from other users don't interfere)
         self.hooks.set_user_id(user_id)
         
         # Get session info
         session_info = self.hooks.session_manager.get_session_info(user_id)
         
-        print(f"\n{'='*60}")
-        print(f"👤 User: {user_id}")
-        print(f"💬 Message: {message}")
+        # Buffer the report and write it once, so each message is a single block
+        lines = ["", _BANNER, f"👤 User: {user_id}", f"💬 Message: {message}"]
         
         if session_info:
-            print(f"📋 Session: {session_info['session_id']}")
-            print(f"⏱️  Duration: {int(session_info['duration'])}s")
-            print(f"💤 Inactive: {int(session_info['inactive_for'])}s")
+            lines.append(f"📋 Session: {session_info['session_id']}")
+            lines.append(f"⏱️  Duration: {int(session_info['duration'])}s")
+            lines.append(f"💤 Inactive: {int(session_info['inactive_for'])}s")
         
         # Process message
         result = await MonkAIRunHooks.run_with_tracking(
@@ -47,8 +51,16 @@ class CustomerSupportBot:
             self.hooks
         )
         
-        print(f"🤖 Response: {result.final_output[:80]}...")
-        print(f"{'='*60}")
+        lines.append(f"🤖 Response: {result.final_output[:80]}...")
+        lines.append(_BANNER)
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+async def _scheduled(delay: float, label: str, bot: CustomerSupportBot, user_id: str, message: str):
+    """Deliver a message `delay` seconds after the scenario starts"""
+    await asyncio.sleep(delay)
+    print(f"\n⏰ T={delay:g}s: {label}")
+    return await bot.handle_message(user_id, message)
 
 
 async def simulate_whatsapp_scenario():
@@ -57,30 +69,22 @@ async def simulate_whatsapp_scenario():
     
     bot = CustomerSupportBot(tracer_token="tk_demo")
     
-    # Simulate interleaved messages from different users
-    print("⏰ T=0s: User A starts conversation")
-    await bot.handle_message("whatsapp-5511999999999", "Hi, I need help")
-    
-    await asyncio.sleep(2)
-    
-    print("\n⏰ T=2s: User B starts (different session)")
-    await bot.handle_message("whatsapp-5511888888888", "Hello there")
-    
-    await asyncio.sleep(3)
-    
-    print("\n⏰ T=5s: User A continues (same session)")
-    await bot.handle_message("whatsapp-5511999999999", "What's the status of order #123?")
-    
-    await asyncio.sleep(2)
-    
-    print("\n⏰ T=7s: User C joins (new session)")
-    await bot.handle_message("whatsapp-5511777777777", "I have a question")
-    
-    await asyncio.sleep(3)
-    
-    print("\n⏰ T=10s: User B continues (same session)")
-    await bot.handle_message("whatsapp-5511888888888", "Can you help me with a refund?")
-    
+    # Messages arrive on their own schedule; the scenario takes as long as the
+    # last arrival instead of the sum of every delay
+    await asyncio.gather(
+        _scheduled(0, "User A starts conversation", bot,
+                   "whatsapp-5511999999999", "Hi, I need help"),
+        _scheduled(2, "User B starts (different session)", bot,
+                   "whatsapp-5511888888888", "Hello there"),
+        _scheduled(5, "User A continues (same session)", bot,
+                   "whatsapp-5511999999999", "What's the status of order #123?"),
+        _scheduled(7, "User C joins (new session)", bot,
+                   "whatsapp-5511777777777", "I have a question"),
+        _scheduled(10, "User B continues (same session)", bot,
+                   "whatsapp-5511888888888", "Can you help me with a refund?"),
+    )
+    
+    await bot.hooks.aclose()
     print("\n✅ Result: 3 users, 3 separate sessions, 5 messages total")
 
 
@@ -102,24 +106,29 @@ async def simulate_session_handoff():
     print("\n📝 User continues conversation:")
     await bot2.handle_message("user-persistence-test", "What's my current balance?")
     
+    await bot1.hooks.aclose()
+    await bot2.hooks.aclose()
     print("\n✅ Session persists across bot restarts (within timeout)")
 
 
 async def main():
-    print("\n" + "="*70)
-    print("MULTI-USER SESSION MANAGEMENT EXAMPLES")
-    print("="*70)
+    print(f"\n{_WIDE_BANNER}\nMULTI-USER SESSION MANAGEMENT EXAMPLES\n{_WIDE_BANNER}")
     
     await simulate_whatsapp_scenario()
     
-    print("\n" + "="*70)
+    print(f"\n{_WIDE_BANNER}")
     
     await simulate_session_handoff()
     
-    print("\n" + "="*70)
-    print("✅ All multi-user scenarios completed!")
-    print("="*70)
+    print(f"\n{_WIDE_BANNER}\n✅ All multi-user scenarios completed!\n{_WIDE_BANNER}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if sys.version_info >= (3, 12):
+        # Hook callbacks rarely suspend; eager tasks run them to completion
+        # without an extra event-loop iteration each.
+        with asyncio.Runner() as runner:
+            runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+            runner.run(main())
+    else:
+        asyncio.run(main())
@@ -0,0 +1,49 @@
+"""Cheap timestamp formatting for per-event hook callbacks"""
+
+import time
+from datetime import datetime, timezone
+from typing import Tuple
+
+# (minute since epoch, "YYYY-MM-DDTHH:MM:") for the last formatted timestamp
+_iso_minute_prefix: Tuple[int, str] = (-1, "")
+# (second since epoch, local "YYYYMMDD-HHMMSS") for the last session stamp
+_stamp_second_prefix: Tuple[int, str] = (-1, "")
+
+
+def fast_iso(ts_ns: int) -> str:
+    """
+    Format a ``time.time_ns()`` value as a naive UTC ISO-8601 timestamp.
+    
+    The date/hour/minute prefix is formatted once per minute and reused; only
+    seconds and microseconds are formatted per call.
+    """
+    global _iso_minute_prefix
+    minute, micros = divmod(ts_ns // 1000, 60_000_000)
+    cached_minute, prefix = _iso_minute_prefix
+    if minute != cached_minute:
+        prefix = datetime.fromtimestamp(minute * 60, timezone.utc).strftime('%Y-%m-%dT%H:%M:')
+        _iso_minute_prefix = (minute, prefix)
+    seconds, micros = divmod(micros, 1_000_000)
+    return f"{prefix}{seconds:02d}.{micros:06d}"
+
+
+def utc_now_iso() -> str:
+    """Current time as a naive UTC ISO-8601 timestamp, like ``datetime.utcnow().isoformat()``"""
+    return fast_iso(time.time_ns())
+
+
+def session_stamp(ts_ns: int) -> str:
+    """
+    Format a ``time.time_ns()`` value in local time as ``YYYYMMDD-HHMMSS-ffffff``,
+    like ``datetime.now().strftime('%Y%m%d-%H%M%S-%f')``.
+    
+    The date and time of day are formatted once per second; only the
+    microseconds are formatted per call.
+    """
+    global _stamp_second_prefix
+    second, micros = divmod(ts_ns // 1000, 1_000_000)
+    cached_second, prefix = _stamp_second_prefix
+    if second != cached_second:
+        prefix = time.strftime('%Y%m%d-%H%M%S', time.localtime(second))
+        _stamp_second_prefix = (second, prefix)
+    return f"{prefix}-{micros:06d}"
@@ -0,0 +1,54 @@
+"""JSON encoding for request bodies, using orjson when it is installed"""
+
+import gzip
+import json
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits; let the stdlib encoder decide
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+# Bodies below this size gain little from gzip and cost a compression pass
+GZIP_MIN_BYTES = 2048
+
+
+def encode_body(obj: Any, compress: bool = False) -> Tuple[bytes, Optional[Dict[str, str]]]:
+    """Encode an upload body, gzipping it when ``compress`` is set and it is large enough
+
+    Returns the body and the extra request headers it needs (or ``None``).
+    """
+    body = dumps(obj)
+    if compress and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=1), {"Content-Encoding": "gzip"}
+    return body, None
+
+
+def dumps_pretty(obj: Any) -> bytes:
+    """Encode ``obj`` as 2-space indented UTF-8 JSON, for exported files"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON from bytes or str without an intermediate str copy under orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
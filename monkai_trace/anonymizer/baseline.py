@@ -1,7 +1,8 @@
 """Hardcoded baseline PII redaction rules. Always applied; no fetch involved."""
 
 from dataclasses import dataclass
-from typing import Any, Iterable, List, Optional, Pattern, Set
+from functools import lru_cache
+from typing import Any, FrozenSet, Iterable, List, Optional, Pattern, Set
 import logging
 import re
 
@@ -112,18 +113,33 @@ BASELINE_RULES: List[BaselineRule] = [
 ]
 
 
+# Longer texts are rarely repeated verbatim and would pin a lot of memory
+_CACHE_MAX_TEXT = 16384
+
+
 class BaselineAnonymizer:
-    """Applies BASELINE_RULES to text content. No configuration."""
+    """Applies BASELINE_RULES to text content. No configuration.
+
+    Redacted results are memoized per (text, disabled classes), so repeated
+    contents such as system prompts and greetings are only scanned once.
+    Pass ``cache_size=0`` to keep no copies of raw text in memory.
+    """
 
-    def __init__(self, rules: Optional[List[BaselineRule]] = None):
+    def __init__(self, rules: Optional[List[BaselineRule]] = None, cache_size: int = 4096):
         self._rules = rules if rules is not None else BASELINE_RULES
         self._card_pattern = _CARD_PATTERN
         self._cpf_pattern = _CPF_PATTERN
+        self._cached_redact = lru_cache(maxsize=cache_size)(self._redact) if cache_size > 0 else None
 
     def apply(self, text: str, disabled_classes: Optional[Iterable[str]] = None) -> str:
         if not text:
             return text
-        disabled = self._coerce_disabled(disabled_classes)
+        disabled = frozenset(self._coerce_disabled(disabled_classes))
+        if self._cached_redact is not None and len(text) <= _CACHE_MAX_TEXT:
+            return self._cached_redact(text, disabled)
+        return self._redact(text, disabled)
+
+    def _redact(self, text: str, disabled: FrozenSet[str]) -> str:
         # CPF runs first via a callable that validates the check digits.
         # This prevents 11-digit phone numbers from being mistaken for CPFs.
         if "cpf" not in disabled:
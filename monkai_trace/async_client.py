@@ -5,9 +5,10 @@ Async MonkAI Client for high-performance applications.
 import asyncio
 import logging
 import aiohttp
-from typing import List, Dict, Any, Optional, Union
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Union
 from pathlib import Path
 
+from . import _json
 from .models import ConversationRecord, LogEntry
 from .exceptions import (
     MonkAIAnonymizerNotReady,
@@ -18,7 +19,7 @@ from .exceptions import (
 )
 from .file_handlers import FileHandler
 from .anonymizer import BaselineAnonymizer, RulesClient
-from .client import _apply_custom_rules_to_message
+from .client import _LOG_FILTERS, _RECORD_FILTERS, _apply_custom_rules_to_message
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +51,10 @@ class AsyncMonkAIClient:
         rules_url: Optional[str] = None,
         rules_ttl_seconds: int = 300,
         rules_client: Optional[RulesClient] = None,
+        connector_limit: int = 100,
+        connector_limit_per_host: int = 20,
+        compress_uploads: bool = False,
+        anonymizer_cache_size: int = 4096,
     ):
         """
         Initialize async MonkAI client.
@@ -67,6 +72,13 @@ class AsyncMonkAIClient:
             rules_ttl_seconds: How long a successful rules fetch is reused.
             rules_client: Optional pre-built ``RulesClient`` (overrides
                 ``rules_url``/``rules_ttl_seconds`` for full control).
+            connector_limit: Maximum simultaneous connections in the pool
+            connector_limit_per_host: Maximum simultaneous connections to the API host
+            compress_uploads: Gzip request bodies of 2 KiB or more
+                (``Content-Encoding: gzip``). Enable only when the API
+                endpoint accepts compressed requests.
+            anonymizer_cache_size: Redacted message contents remembered so
+                repeated texts are scanned once; 0 disables the cache.
         """
         if not tracer_token or not tracer_token.startswith("tk_"):
             raise MonkAIValidationError("Invalid tracer_token format. Must start with 'tk_'")
@@ -76,7 +88,11 @@ class AsyncMonkAIClient:
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
         self._session: Optional[aiohttp.ClientSession] = None
-        self._anonymizer = BaselineAnonymizer()
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connector_limit = connector_limit
+        self._connector_limit_per_host = connector_limit_per_host
+        self._compress_uploads = compress_uploads
+        self._anonymizer = BaselineAnonymizer(cache_size=anonymizer_cache_size)
         self._strict_dedup = strict_dedup
         if rules_client is not None:
             self._rules_client: Optional[RulesClient] = rules_client
@@ -100,16 +116,29 @@ class AsyncMonkAIClient:
         await self.close()
     
     async def _ensure_session(self):
-        """Ensure aiohttp session exists"""
+        """Ensure a pooled aiohttp session exists for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._session_loop is not loop:
+            # aiohttp sessions are bound to the loop that created them; one left
+            # over from a previous asyncio.run() cannot be reused.
+            self._session = None
         if self._session is None or self._session.closed:
             headers = {
                 "tracer_token": self.tracer_token,
                 "Content-Type": "application/json"
             }
+            connector = aiohttp.TCPConnector(
+                limit=self._connector_limit,
+                limit_per_host=self._connector_limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=30,
+            )
             self._session = aiohttp.ClientSession(
                 headers=headers,
-                timeout=self.timeout
+                timeout=self.timeout,
+                connector=connector
             )
+            self._session_loop = loop
     
     async def close(self):
         """Close the aiohttp session"""
@@ -120,20 +149,27 @@ class AsyncMonkAIClient:
         self,
         method: str,
         endpoint: str,
-        data: Optional[Dict] = None
-    ) -> Dict[str, Any]:
-        """Make HTTP request with retry logic"""
+        data: Optional[Dict] = None,
+        decode_response: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Make HTTP request with retry logic (``decode_response=False`` skips parsing the body)"""
         await self._ensure_session()
         url = f"{self.base_url}/{endpoint}"
+        # Encode once (orjson when available), not on every retry
+        body, headers = (
+            _json.encode_body(data, self._compress_uploads) if data is not None else (None, None)
+        )
         
         for attempt in range(self.max_retries):
             try:
-                async with self._session.request(method, url, json=data) as response:
+                async with self._session.request(method, url, data=body, headers=headers) as response:
                     if response.status == 401:
                         raise MonkAIAuthError("Invalid tracer token")
                     
                     response.raise_for_status()
-                    return await response.json()
+                    if not decode_response:
+                        return None
+                    return await response.json(loads=_json.loads)
                     
             except aiohttp.ClientError as e:
                 if attempt == self.max_retries - 1:
@@ -260,7 +296,8 @@ class AsyncMonkAIClient:
         self,
         records: List[ConversationRecord],
         chunk_size: int = 100,
-        parallel: bool = True
+        parallel: bool = True,
+        max_concurrency: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Upload multiple records in batches.
@@ -269,6 +306,8 @@ class AsyncMonkAIClient:
             records: List of ConversationRecord objects
             chunk_size: Records per batch
             parallel: Upload chunks in parallel (faster)
+            max_concurrency: Chunks in flight at once when parallel
+                (defaults to ``connector_limit_per_host``)
         
         Returns:
             Summary dict with total_inserted, total_records, failures
@@ -276,9 +315,7 @@ class AsyncMonkAIClient:
         chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
         
         if parallel:
-            # Upload all chunks in parallel
-            tasks = [self._upload_records_chunk(chunk) for chunk in chunks]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            results = await self._gather_chunks(self._upload_records_chunk, chunks, max_concurrency)
         else:
             # Upload chunks sequentially
             results = []
@@ -303,7 +340,7 @@ class AsyncMonkAIClient:
             if isinstance(result, Exception):
                 failures.append({"chunk": i, "error": str(result)})
             else:
-                total_inserted += result.get("total_inserted", 0)
+                total_inserted += result.get("inserted_count", 0)
         
         return {
             "total_inserted": total_inserted,
@@ -311,6 +348,22 @@ class AsyncMonkAIClient:
             "failures": failures
         }
     
+    async def _gather_chunks(
+        self,
+        upload_chunk: Callable[[list], Awaitable[Dict[str, Any]]],
+        chunks: List[list],
+        max_concurrency: Optional[int]
+    ) -> List[Any]:
+        """Upload chunks concurrently, at most ``max_concurrency`` at a time, keeping chunk order"""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self._connector_limit_per_host))
+        
+        async def bounded(chunk):
+            # Acquire before serializing so queued chunks don't all build payloads up front
+            async with semaphore:
+                return await upload_chunk(chunk)
+        
+        return await asyncio.gather(*(bounded(chunk) for chunk in chunks), return_exceptions=True)
+    
     async def _upload_records_chunk(self, records: List[ConversationRecord]) -> Dict[str, Any]:
         """Upload a chunk of records"""
         records_data = [await self._serialize_record(r) for r in records]
@@ -371,19 +424,23 @@ class AsyncMonkAIClient:
         
         return await self._upload_single_log(log)
     
-    async def _upload_single_log(self, log: LogEntry) -> Dict[str, Any]:
+    async def _upload_single_log(
+        self, log: LogEntry, decode_response: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """Upload a single log entry"""
         return await self._make_request(
             "POST",
             "logs/upload",
-            data={"logs": [log.to_api_format()]}
+            data={"logs": [log.to_api_format()]},
+            decode_response=decode_response
         )
     
     async def upload_logs_batch(
         self,
         logs: List[LogEntry],
         chunk_size: int = 100,
-        parallel: bool = True
+        parallel: bool = True,
+        max_concurrency: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Upload multiple log entries in batches.
@@ -392,6 +449,8 @@ class AsyncMonkAIClient:
             logs: List of LogEntry objects
             chunk_size: Logs per batch
             parallel: Upload in parallel
+            max_concurrency: Chunks in flight at once when parallel
+                (defaults to ``connector_limit_per_host``)
         
         Returns:
             Summary dict
@@ -399,8 +458,7 @@ class AsyncMonkAIClient:
         chunks = [logs[i:i + chunk_size] for i in range(0, len(logs), chunk_size)]
         
         if parallel:
-            tasks = [self._upload_logs_chunk(chunk) for chunk in chunks]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            results = await self._gather_chunks(self._upload_logs_chunk, chunks, max_concurrency)
         else:
             results = []
             for chunk in chunks:
@@ -483,14 +541,8 @@ class AsyncMonkAIClient:
             Dict with 'records' list and 'count' total
         """
         query = {"limit": limit, "offset": offset}
-        if agent:
-            query["agent"] = agent
-        if session_id:
-            query["session_id"] = session_id
-        if start_date:
-            query["start_date"] = start_date
-        if end_date:
-            query["end_date"] = end_date
+        filters = (agent, session_id, start_date, end_date)
+        query.update({k: v for k, v in zip(_RECORD_FILTERS, filters) if v})
         
         return await self._make_request(
             "POST", "record_query",
@@ -523,14 +575,8 @@ class AsyncMonkAIClient:
             Dict with 'logs' list and 'count' total
         """
         data = {"namespace": namespace, "limit": limit, "offset": offset}
-        if level:
-            data["level"] = level
-        if resource_id:
-            data["resource_id"] = resource_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (level, resource_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_LOG_FILTERS, filters) if v})
         
         return await self._make_request("POST", "logs/query", data=data)
     
@@ -544,7 +590,8 @@ class AsyncMonkAIClient:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         format: str = "json",
-        output_file: Optional[str] = None
+        output_file: Optional[str] = None,
+        return_content: bool = True
     ) -> Union[List[Dict], str]:
         """
         Export all records matching filters (handles pagination server-side).
@@ -557,6 +604,9 @@ class AsyncMonkAIClient:
             end_date: Filter records before this date (ISO-8601)
             format: Output format ('json' or 'csv')
             output_file: Optional file path to save export
+            return_content: With ``format='csv'`` and ``output_file``, pass
+                False to stream the CSV to disk without holding it in memory;
+                the file path is returned instead of the CSV text
         
         Returns:
             List of record dicts (json) or CSV string (csv)
@@ -564,14 +614,8 @@ class AsyncMonkAIClient:
         await self._ensure_session()
         url = f"{self.base_url}/records/export"
         data = {"namespace": namespace, "format": format}
-        if agent:
-            data["agent"] = agent
-        if session_id:
-            data["session_id"] = session_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (agent, session_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_RECORD_FILTERS, filters) if v})
         
         timeout = aiohttp.ClientTimeout(total=120)
         async with self._session.post(url, json=data, timeout=timeout) as response:
@@ -579,19 +623,24 @@ class AsyncMonkAIClient:
                 raise MonkAIAuthError("Invalid tracer token")
             response.raise_for_status()
             
+            if format == "csv" and output_file and not return_content:
+                with open(output_file, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(1 << 20):
+                        f.write(chunk)
+                return output_file
+            
+            raw = await response.read()
             if format == "csv":
-                content = await response.text()
                 if output_file:
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                return content
+                    with open(output_file, 'wb') as f:
+                        f.write(raw)
+                return raw.decode(response.charset or "utf-8", errors="replace")
             else:
-                result = await response.json()
+                result = _json.loads(raw)
                 records = result.get("records", [])
                 if output_file:
-                    import json as json_mod
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json_mod.dump(records, f, ensure_ascii=False, indent=2)
+                    with open(output_file, 'wb') as f:
+                        f.write(_json.dumps_pretty(records))
                 return records
     
     async def export_logs(
@@ -602,7 +651,8 @@ class AsyncMonkAIClient:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         format: str = "json",
-        output_file: Optional[str] = None
+        output_file: Optional[str] = None,
+        return_content: bool = True
     ) -> Union[List[Dict], str]:
         """
         Export all logs matching filters (handles pagination server-side).
@@ -615,6 +665,9 @@ class AsyncMonkAIClient:
             end_date: Filter logs before this date (ISO-8601)
             format: Output format ('json' or 'csv')
             output_file: Optional file path to save export
+            return_content: With ``format='csv'`` and ``output_file``, pass
+                False to stream the CSV to disk without holding it in memory;
+                the file path is returned instead of the CSV text
         
         Returns:
             List of log dicts (json) or CSV string (csv)
@@ -622,14 +675,8 @@ class AsyncMonkAIClient:
         await self._ensure_session()
         url = f"{self.base_url}/logs/export"
         data = {"namespace": namespace, "format": format}
-        if level:
-            data["level"] = level
-        if resource_id:
-            data["resource_id"] = resource_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (level, resource_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_LOG_FILTERS, filters) if v})
         
         timeout = aiohttp.ClientTimeout(total=120)
         async with self._session.post(url, json=data, timeout=timeout) as response:
@@ -637,19 +684,24 @@ class AsyncMonkAIClient:
                 raise MonkAIAuthError("Invalid tracer token")
             response.raise_for_status()
             
+            if format == "csv" and output_file and not return_content:
+                with open(output_file, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(1 << 20):
+                        f.write(chunk)
+                return output_file
+            
+            raw = await response.read()
             if format == "csv":
-                content = await response.text()
                 if output_file:
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                return content
+                    with open(output_file, 'wb') as f:
+                        f.write(raw)
+                return raw.decode(response.charset or "utf-8", errors="replace")
             else:
-                result = await response.json()
+                result = _json.loads(raw)
                 logs = result.get("logs", [])
                 if output_file:
-                    import json as json_mod
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json_mod.dump(logs, f, ensure_ascii=False, indent=2)
+                    with open(output_file, 'wb') as f:
+                        f.write(_json.dumps_pretty(logs))
                 return logs
     
     # ==================== UTILITY METHODS ====================
@@ -662,10 +714,10 @@ class AsyncMonkAIClient:
             True if connection successful, False otherwise
         """
         try:
-            await self.upload_log(
-                namespace="test",
-                level="info",
-                message="Connection test"
+            # Only the status matters; skip decoding the response body
+            await self._upload_single_log(
+                LogEntry(namespace="test", level="info", message="Connection test"),
+                decode_response=False
             )
             return True
         except Exception:
@@ -2,10 +2,18 @@
 
 import re
 import time
+import atexit
 import logging
+import threading
+import weakref
 import requests
-from typing import List, Optional, Union, Dict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Union, Dict, Sequence, Tuple
 from pathlib import Path
+from . import _json
 from .models import ConversationRecord, LogEntry, TokenUsage
 from .file_handlers import FileHandler
 from .anonymizer import BaselineAnonymizer, RulesClient
@@ -103,6 +111,49 @@ def _apply_custom_to_dict(d, compiled):
     return out
 
 
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to ``size`` items from any iterable"""
+    if isinstance(items, Sequence):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+        return
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _until_parse_error(items: Iterable, errors: List[ValueError]) -> Iterator:
+    """Yield from ``items``; a malformed file ends the stream and is recorded in ``errors``"""
+    try:
+        yield from items
+    except ValueError as e:
+        errors.append(e)
+
+
+# Optional query/export filters; only the ones given (truthy) go in the body
+_RECORD_FILTERS = ("agent", "session_id", "start_date", "end_date")
+_LOG_FILTERS = ("level", "resource_id", "start_date", "end_date")
+
+
+# Transient statuses worth another attempt: rate limiting and server errors
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+_MAX_RETRY_AFTER = 60.0
+
+
+def _retry_delay(response: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After, else 2**attempt"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), _MAX_RETRY_AFTER)
+        except (TypeError, ValueError):
+            pass  # HTTP-date form; fall back to exponential backoff
+    return 2 ** attempt
+
+
 class MonkAIClient:
     """
     Synchronous client for MonkAI API
@@ -117,6 +168,19 @@ class MonkAIClient:
     
     BASE_URL = "https://lpvbvnqrozlwalnkvrgk.supabase.co/functions/v1/monkai-api"
     
+    # Slotted state keeps per-client memory low when an app holds one client per
+    # tenant. __dict__ stays available (allocated only on first use) so callers
+    # can still monkeypatch methods on an instance, e.g. in tests.
+    __slots__ = (
+        "tracer_token", "timeout", "max_retries", "_base_url",
+        "_records_upload_url", "_logs_upload_url", "_record_query_url", "_logs_query_url",
+        "_records_export_url", "_logs_export_url", "_sessions_url",
+        "_compress_uploads", "_session", "_pool_size", "_anonymizer", "_anonymizer_cache_size",
+        "_strict_dedup", "_rules_client", "_last_anonymization_version",
+        "_flush_threshold", "_flush_interval", "_pending_records", "_pending_lock", "_flush_timer",
+        "__dict__", "__weakref__",
+    )
+    
     def __init__(
         self,
         tracer_token: str,
@@ -127,6 +191,11 @@ class MonkAIClient:
         rules_url: Optional[str] = None,
         rules_ttl_seconds: int = 300,
         rules_client: Optional[RulesClient] = None,
+        pool_maxsize: int = 32,
+        compress_uploads: bool = False,
+        flush_threshold: int = 64,
+        flush_interval: float = 1.0,
+        anonymizer_cache_size: int = 4096,
     ):
         """
         Initialize MonkAI client
@@ -145,17 +214,33 @@ class MonkAIClient:
                 before being refreshed. Defaults to 300s.
             rules_client: Optional pre-built ``RulesClient`` (overrides
                 ``rules_url``/``rules_ttl_seconds`` for full control).
+            pool_maxsize: Keep-alive connections kept per host, so back-to-back
+                and concurrent chunk uploads reuse TCP/TLS connections.
+            compress_uploads: Gzip upload bodies of 2 KiB or more
+                (``Content-Encoding: gzip``). Enable only when the API
+                endpoint accepts compressed requests.
+            flush_threshold: Records buffered by ``enqueue_record()`` before
+                they are sent as one batch request.
+            flush_interval: Seconds after the first buffered record at which
+                a partial batch is sent anyway.
+            anonymizer_cache_size: Redacted message contents remembered so
+                repeated texts are scanned once; 0 disables the cache.
         """
         self.tracer_token = tracer_token
         self.base_url = base_url or self.BASE_URL
         self.timeout = timeout
         self.max_retries = max_retries
+        self._compress_uploads = compress_uploads
         self._session = requests.Session()
+        self._pool_size = 0
+        self._ensure_pool_size(max(pool_maxsize, DEFAULT_POOLSIZE))
         self._session.headers.update({
             "tracer_token": tracer_token,
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
         })
-        self._anonymizer = BaselineAnonymizer()
+        self._anonymizer = BaselineAnonymizer(cache_size=anonymizer_cache_size)
+        self._anonymizer_cache_size = anonymizer_cache_size
         self._strict_dedup = strict_dedup
         if rules_client is not None:
             self._rules_client: Optional[RulesClient] = rules_client
@@ -168,6 +253,27 @@ class MonkAIClient:
         else:
             self._rules_client = None
         self._last_anonymization_version: Optional[int] = None
+        self._flush_threshold = max(1, flush_threshold)
+        self._flush_interval = flush_interval
+        self._pending_records: List[ConversationRecord] = []
+        self._pending_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+    
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+    
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        # Endpoint URLs are built once here instead of on every call
+        self._base_url = value
+        self._records_upload_url = f"{value}/records/upload"
+        self._logs_upload_url = f"{value}/logs/upload"
+        self._record_query_url = f"{value}/record_query"
+        self._logs_query_url = f"{value}/logs/query"
+        self._records_export_url = f"{value}/records/export"
+        self._logs_export_url = f"{value}/logs/export"
+        self._sessions_url = f"{value}/sessions/get-or-create"
     
     # ==================== RECORD METHODS ====================
     
@@ -232,7 +338,8 @@ class MonkAIClient:
     def upload_records_batch(
         self,
         records: List[ConversationRecord],
-        chunk_size: int = 100
+        chunk_size: int = 100,
+        max_concurrency: int = 6
     ) -> Dict:
         """
         Upload multiple records in batches
@@ -240,25 +347,14 @@ class MonkAIClient:
         Args:
             records: List of ConversationRecord objects
             chunk_size: Number of records per request
+            max_concurrency: Chunks uploaded at once over the keep-alive pool (1 = sequential)
         
         Returns:
             Summary dict with success/failure counts
         """
-        total_inserted = 0
-        failures = []
-        
-        for i in range(0, len(records), chunk_size):
-            chunk = records[i:i + chunk_size]
-            try:
-                response = self._upload_records_chunk(chunk)
-                total_inserted += response.get('inserted_count', 0)
-            except MonkAIRecordDiscardedError:
-                raise  # never swallow strict-mode signal
-            except Exception as e:
-                failures.append({
-                    'chunk_index': i // chunk_size,
-                    'error': str(e)
-                })
+        total_inserted, _, failures = self._upload_chunks(
+            self._upload_records_chunk, records, chunk_size, max_concurrency
+        )
 
         return {
             'total_inserted': total_inserted,
@@ -269,21 +365,94 @@ class MonkAIClient:
     def upload_records_from_json(
         self,
         file_path: Union[str, Path],
-        chunk_size: int = 100
+        chunk_size: int = 100,
+        max_concurrency: int = 6
     ) -> Dict:
         """
         Upload conversation records from JSON file
         
+        The file is parsed incrementally and each chunk is uploaded as soon as
+        it is read, so memory stays proportional to ``chunk_size``.
+        
         Args:
             file_path: Path to JSON file (format: {"records": [...]})
             chunk_size: Number of records per batch request
+            max_concurrency: Chunks uploaded at once (1 = sequential)
+        
+        Returns:
+            Upload summary dict. If the file turns out to be malformed part
+            way through, the records read before the error are still uploaded
+            and the summary carries the error under ``parse_error``.
+        """
+        parse_errors: List[ValueError] = []
+        records = _until_parse_error(FileHandler.iter_records_from_json(file_path), parse_errors)
+        total_inserted, total_records, failures = self._upload_chunks(
+            self._upload_records_chunk, records, chunk_size, max_concurrency
+        )
+        summary = {
+            'total_inserted': total_inserted,
+            'total_records': total_records,
+            'failures': failures
+        }
+        if parse_errors:
+            summary['parse_error'] = str(parse_errors[0])
+            logger.error(f"Stopped reading {file_path} after {total_records} records: {parse_errors[0]}")
+        else:
+            logger.info(f"Uploaded {total_records} records from {file_path}")
+        return summary
+    
+    def enqueue_record(self, record: ConversationRecord) -> None:
+        """
+        Buffer a record and upload it together with others in one request
+        
+        The buffer is sent when it reaches ``flush_threshold`` records (in
+        the calling thread) or ``flush_interval`` seconds after the first
+        buffered record (on a timer thread). Call ``flush_pending()`` or
+        ``close()`` to send it immediately; anything left at interpreter
+        exit is flushed by an ``atexit`` handler.
+        
+        Args:
+            record: ConversationRecord to upload
+        """
+        with self._pending_lock:
+            self._pending_records.append(record)
+            if len(self._pending_records) < self._flush_threshold:
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self._flush_interval, self._flush_on_timer)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                    _clients_with_pending.add(self)
+                return
+        self.flush_pending()
+    
+    def flush_pending(self) -> Dict:
+        """
+        Upload records buffered by ``enqueue_record()`` now
         
         Returns:
-            Upload summary dict
+            Summary dict with success/failure counts
         """
-        records = FileHandler.load_records_from_json(file_path)
-        logger.info(f"Loaded {len(records)} records from {file_path}")
-        return self.upload_records_batch(records, chunk_size=chunk_size)
+        with self._pending_lock:
+            records, self._pending_records = self._pending_records, []
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if not records:
+            return {'total_inserted': 0, 'total_records': 0, 'failures': []}
+        result = self.upload_records_batch(records, chunk_size=self._flush_threshold)
+        if result['failures']:
+            logger.warning(
+                "MonkAI: %d of %d buffered chunks failed to upload",
+                len(result['failures']), -(-len(records) // self._flush_threshold)
+            )
+        return result
+    
+    def _flush_on_timer(self) -> None:
+        try:
+            self.flush_pending()
+        except Exception as e:
+            # Nobody can catch errors raised on the timer thread
+            logger.error("MonkAI: flushing buffered records failed: %s", e)
     
     # ==================== LOG METHODS ====================
     
@@ -324,7 +493,8 @@ class MonkAIClient:
     def upload_logs_batch(
         self,
         logs: List[LogEntry],
-        chunk_size: int = 100
+        chunk_size: int = 100,
+        max_concurrency: int = 6
     ) -> Dict:
         """
         Upload multiple logs in batches
@@ -332,23 +502,14 @@ class MonkAIClient:
         Args:
             logs: List of LogEntry objects
             chunk_size: Number of logs per request
+            max_concurrency: Chunks uploaded at once over the keep-alive pool (1 = sequential)
         
         Returns:
             Summary dict with success/failure counts
         """
-        total_inserted = 0
-        failures = []
-        
-        for i in range(0, len(logs), chunk_size):
-            chunk = logs[i:i + chunk_size]
-            try:
-                response = self._upload_logs_chunk(chunk)
-                total_inserted += response.get('inserted_count', 0)
-            except Exception as e:
-                failures.append({
-                    'chunk_index': i // chunk_size,
-                    'error': str(e)
-                })
+        total_inserted, _, failures = self._upload_chunks(
+            self._upload_logs_chunk, logs, chunk_size, max_concurrency
+        )
         
         return {
             'total_inserted': total_inserted,
@@ -360,52 +521,154 @@ class MonkAIClient:
         self,
         file_path: Union[str, Path],
         namespace: str,
-        chunk_size: int = 100
+        chunk_size: int = 100,
+        max_concurrency: int = 6
     ) -> Dict:
         """
         Upload logs from JSON file
         
+        The file is parsed incrementally and each chunk is uploaded as soon as
+        it is read, so memory stays proportional to ``chunk_size``.
+        
         Args:
             file_path: Path to JSON file (format: {"logs": [...]})
             namespace: Namespace to assign to logs (if not in JSON)
             chunk_size: Number of logs per batch request
+            max_concurrency: Chunks uploaded at once (1 = sequential)
         
         Returns:
-            Upload summary dict
+            Upload summary dict. If the file turns out to be malformed part
+            way through, the logs read before the error are still uploaded
+            and the summary carries the error under ``parse_error``.
         """
-        logs = FileHandler.load_logs_from_json(file_path)
-        
-        # Set namespace if not already present
-        for log in logs:
-            if not log.namespace:
-                log.namespace = namespace
+        def with_namespace():
+            # Set namespace if not already present
+            for log in FileHandler.iter_logs_from_json(file_path):
+                if not log.namespace:
+                    log.namespace = namespace
+                yield log
         
-        logger.info(f"Loaded {len(logs)} logs from {file_path}")
-        return self.upload_logs_batch(logs, chunk_size=chunk_size)
+        parse_errors: List[ValueError] = []
+        total_inserted, total_logs, failures = self._upload_chunks(
+            self._upload_logs_chunk, _until_parse_error(with_namespace(), parse_errors),
+            chunk_size, max_concurrency
+        )
+        summary = {
+            'total_inserted': total_inserted,
+            'total_logs': total_logs,
+            'failures': failures
+        }
+        if parse_errors:
+            summary['parse_error'] = str(parse_errors[0])
+            logger.error(f"Stopped reading {file_path} after {total_logs} logs: {parse_errors[0]}")
+        else:
+            logger.info(f"Uploaded {total_logs} logs from {file_path}")
+        return summary
     
     # ==================== INTERNAL METHODS ====================
     
+    def _upload_chunks(
+        self,
+        upload_chunk: Callable[[list], Dict],
+        items: Iterable,
+        chunk_size: int,
+        max_concurrency: int
+    ) -> Tuple[int, int, List[Dict]]:
+        """Upload ``items`` in chunks, up to ``max_concurrency`` requests in flight
+        
+        ``items`` may be a lazy iterator; at most twice ``max_concurrency``
+        chunks are held at once. Returns (inserted, item count, failures).
+        """
+        workers = max_concurrency
+        if isinstance(items, Sequence):
+            workers = min(workers, -(-len(items) // chunk_size))
+        
+        def attempt(chunk):
+            try:
+                return upload_chunk(chunk)
+            except Exception as e:
+                return e
+        
+        total_items = 0
+        results = []
+        if workers <= 1:
+            for chunk in _chunked(items, chunk_size):
+                total_items += len(chunk)
+                result = attempt(chunk)
+                if isinstance(result, MonkAIRecordDiscardedError):
+                    raise result  # never swallow strict-mode signal
+                results.append(result)
+        else:
+            self._ensure_pool_size(workers)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monkai-upload") as pool:
+                # Futures are collected in submission order, so failures keep their index
+                in_flight: Deque[Future] = deque()
+                for chunk in _chunked(items, chunk_size):
+                    total_items += len(chunk)
+                    in_flight.append(pool.submit(attempt, chunk))
+                    if len(in_flight) >= 2 * workers:
+                        results.append(in_flight.popleft().result())
+                results.extend(future.result() for future in in_flight)
+            for result in results:
+                if isinstance(result, MonkAIRecordDiscardedError):
+                    raise result
+        
+        total_inserted = 0
+        failures = []
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                failures.append({
+                    'chunk_index': index,
+                    'error': str(result)
+                })
+            else:
+                total_inserted += result.get('inserted_count', 0)
+        return total_inserted, total_items, failures
+    
+    def _ensure_pool_size(self, size: int) -> None:
+        """Grow the session's keep-alive pool so concurrent chunks don't discard connections"""
+        if size <= self._pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size, pool_block=False)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._pool_size = size
+    
+    def _post_json(self, url: str, data: Dict) -> requests.Response:
+        """POST an encoded (and optionally gzipped) JSON upload body"""
+        body, headers = _json.encode_body(data, self._compress_uploads)
+        return self._request_with_retry("POST", url, data=body, headers=headers)
+    
     def _request_with_retry(self, method: str, url: str, **kwargs) -> requests.Response:
         """Execute HTTP request with exponential backoff retry."""
         kwargs.setdefault("timeout", self.timeout)
+        request = self._session.request
+        last_attempt = self.max_retries - 1
         for attempt in range(self.max_retries):
             try:
-                response = self._session.request(method, url, **kwargs)
-                if response.status_code == 401:
+                response = request(method, url, **kwargs)
+                status = response.status_code
+                if status == 401:
+                    response.close()
                     raise MonkAIAuthError("Invalid tracer token")
-                if response.status_code >= 500 and attempt < self.max_retries - 1:
-                    time.sleep(2 ** attempt)
+                if status in _RETRY_STATUSES and attempt < last_attempt:
+                    delay = _retry_delay(response, attempt)
+                    # Hand the connection back to the pool before waiting;
+                    # streamed exports would otherwise hold it open
+                    response.close()
+                    time.sleep(delay)
                     continue
-                if response.status_code not in (200, 201):
-                    error_msg = f"{response.status_code} {response.reason}"
+                if status not in (200, 201):
+                    error_msg = f"{status} {response.reason}"
                     try:
                         error_msg += f": {response.json()}"
                     except Exception:
                         error_msg += f": {response.text[:200]}"
+                    response.close()
                     raise MonkAIAPIError(error_msg)
                 return response
             except (requests.ConnectionError, requests.Timeout) as e:
-                if attempt == self.max_retries - 1:
+                if attempt == last_attempt:
                     raise MonkAINetworkError(f"Request failed after {self.max_retries} attempts: {e}")
                 time.sleep(2 ** attempt)
         raise MonkAIAPIError("Request failed after all retries")
@@ -479,30 +742,27 @@ class MonkAIClient:
 
     def _upload_single_record(self, record: ConversationRecord) -> Dict:
         """Internal: Upload single record"""
-        url = f"{self.base_url}/records/upload"
         data = {"records": [self._serialize_record(record)]}
-        response = self._request_with_retry("POST", url, json=data)
+        response = self._post_json(self._records_upload_url, data)
         return self._check_dedup_response(response.json(), total_records=1)
 
     def _upload_records_chunk(self, records: List[ConversationRecord]) -> Dict:
         """Internal: Upload chunk of records"""
-        url = f"{self.base_url}/records/upload"
-        data = {"records": [self._serialize_record(r) for r in records]}
-        response = self._request_with_retry("POST", url, json=data)
+        serialize = self._serialize_record
+        data = {"records": [serialize(r) for r in records]}
+        response = self._post_json(self._records_upload_url, data)
         return self._check_dedup_response(response.json(), total_records=len(records))
     
-    def _upload_single_log(self, log: LogEntry) -> Dict:
-        """Internal: Upload single log"""
-        url = f"{self.base_url}/logs/upload"
+    def _upload_single_log(self, log: LogEntry, decode_response: bool = True) -> Optional[Dict]:
+        """Internal: Upload single log (``decode_response=False`` skips parsing the body)"""
         data = {"logs": [log.to_api_format()]}
-        response = self._request_with_retry("POST", url, json=data)
-        return response.json()
+        response = self._post_json(self._logs_upload_url, data)
+        return response.json() if decode_response else None
     
     def _upload_logs_chunk(self, logs: List[LogEntry]) -> Dict:
         """Internal: Upload chunk of logs"""
-        url = f"{self.base_url}/logs/upload"
         data = {"logs": [l.to_api_format() for l in logs]}
-        response = self._request_with_retry("POST", url, json=data)
+        response = self._post_json(self._logs_upload_url, data)
         return response.json()
     
     # ==================== QUERY METHODS ====================
@@ -532,16 +792,10 @@ class MonkAIClient:
         Returns:
             Dict with 'records' list and 'count' total
         """
-        url = f"{self.base_url}/record_query"
+        url = self._record_query_url
         query = {"limit": limit, "offset": offset}
-        if agent:
-            query["agent"] = agent
-        if session_id:
-            query["session_id"] = session_id
-        if start_date:
-            query["start_date"] = start_date
-        if end_date:
-            query["end_date"] = end_date
+        filters = (agent, session_id, start_date, end_date)
+        query.update({k: v for k, v in zip(_RECORD_FILTERS, filters) if v})
         
         data = {"namespace": namespace, "query": query}
         response = self._request_with_retry("POST", url, json=data)
@@ -572,16 +826,10 @@ class MonkAIClient:
         Returns:
             Dict with 'logs' list and 'count' total
         """
-        url = f"{self.base_url}/logs/query"
+        url = self._logs_query_url
         data = {"namespace": namespace, "limit": limit, "offset": offset}
-        if level:
-            data["level"] = level
-        if resource_id:
-            data["resource_id"] = resource_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (level, resource_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_LOG_FILTERS, filters) if v})
         
         response = self._request_with_retry("POST", url, json=data)
         return response.json()
@@ -596,7 +844,8 @@ class MonkAIClient:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         format: str = "json",
-        output_file: Optional[str] = None
+        output_file: Optional[str] = None,
+        return_content: bool = True
     ) -> Union[List[Dict], str]:
         """
         Export all records matching filters (handles pagination server-side)
@@ -609,37 +858,31 @@ class MonkAIClient:
             end_date: Filter records before this date (ISO-8601)
             format: Output format ('json' or 'csv')
             output_file: Optional file path to save export
+            return_content: With ``format='csv'`` and ``output_file``, pass
+                False to stream the CSV to disk without holding it in memory;
+                the file path is returned instead of the CSV text
         
         Returns:
             List of record dicts (json) or CSV string (csv)
         """
-        url = f"{self.base_url}/records/export"
+        url = self._records_export_url
         data = {"namespace": namespace, "format": format}
-        if agent:
-            data["agent"] = agent
-        if session_id:
-            data["session_id"] = session_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (agent, session_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_RECORD_FILTERS, filters) if v})
         
-        response = self._request_with_retry("POST", url, json=data, timeout=max(self.timeout, 120))
+        response = self._request_with_retry(
+            "POST", url, data=_json.dumps(data), timeout=max(self.timeout, 120), stream=True
+        )
         
         if format == "csv":
-            content = response.text
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logger.info(f"Exported CSV to {output_file}")
+            content = self._write_csv_export(response, output_file, return_content)
             return content
         else:
-            result = response.json()
+            result = _json.loads(response.content)
             records = result.get("records", [])
             if output_file:
-                import json
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(records, f, ensure_ascii=False, indent=2)
+                with open(output_file, 'wb') as f:
+                    f.write(_json.dumps_pretty(records))
                 logger.info(f"Exported {len(records)} records to {output_file}")
             return records
     
@@ -651,7 +894,8 @@ class MonkAIClient:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         format: str = "json",
-        output_file: Optional[str] = None
+        output_file: Optional[str] = None,
+        return_content: bool = True
     ) -> Union[List[Dict], str]:
         """
         Export all logs matching filters (handles pagination server-side)
@@ -664,40 +908,61 @@ class MonkAIClient:
             end_date: Filter logs before this date (ISO-8601)
             format: Output format ('json' or 'csv')
             output_file: Optional file path to save export
+            return_content: With ``format='csv'`` and ``output_file``, pass
+                False to stream the CSV to disk without holding it in memory;
+                the file path is returned instead of the CSV text
         
         Returns:
             List of log dicts (json) or CSV string (csv)
         """
-        url = f"{self.base_url}/logs/export"
+        url = self._logs_export_url
         data = {"namespace": namespace, "format": format}
-        if level:
-            data["level"] = level
-        if resource_id:
-            data["resource_id"] = resource_id
-        if start_date:
-            data["start_date"] = start_date
-        if end_date:
-            data["end_date"] = end_date
+        filters = (level, resource_id, start_date, end_date)
+        data.update({k: v for k, v in zip(_LOG_FILTERS, filters) if v})
         
-        response = self._request_with_retry("POST", url, json=data, timeout=max(self.timeout, 120))
+        response = self._request_with_retry(
+            "POST", url, data=_json.dumps(data), timeout=max(self.timeout, 120), stream=True
+        )
         
         if format == "csv":
-            content = response.text
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logger.info(f"Exported CSV to {output_file}")
+            content = self._write_csv_export(response, output_file, return_content)
             return content
         else:
-            result = response.json()
+            result = _json.loads(response.content)
             logs = result.get("logs", [])
             if output_file:
-                import json
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(logs, f, ensure_ascii=False, indent=2)
+                with open(output_file, 'wb') as f:
+                    f.write(_json.dumps_pretty(logs))
                 logger.info(f"Exported {len(logs)} logs to {output_file}")
             return logs
     
+    @staticmethod
+    def _write_csv_export(
+        response: requests.Response,
+        output_file: Optional[str],
+        return_content: bool = True
+    ) -> str:
+        """Copy a streamed CSV export to ``output_file`` as raw bytes and return it as text
+        
+        With ``return_content=False`` the body only passes through a 1 MiB
+        buffer on its way to disk and ``output_file`` is returned.
+        """
+        if not output_file:
+            raw = response.content
+        else:
+            chunks = []
+            with open(output_file, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+                    if return_content:
+                        chunks.append(chunk)
+            logger.info(f"Exported CSV to {output_file}")
+            if not return_content:
+                return output_file
+            raw = b"".join(chunks)
+        # Decode once with the declared charset; skips requests' charset sniffing
+        return raw.decode(response.encoding or "utf-8", errors="replace")
+    
     # ==================== SESSION METHODS ====================
     
     def get_or_create_session(
@@ -723,7 +988,7 @@ class MonkAIClient:
         Returns:
             Dict with session_id, reused (bool), and metadata
         """
-        url = f"{self.base_url}/sessions/get-or-create"
+        url = self._sessions_url
         data = {
             "namespace": namespace,
             "user_id": user_id,
@@ -735,15 +1000,35 @@ class MonkAIClient:
     
     # ==================== UTILITY METHODS ====================
     
+    def close(self) -> None:
+        """Upload records still buffered by ``enqueue_record()`` and close the HTTP session"""
+        try:
+            self.flush_pending()
+        finally:
+            _clients_with_pending.discard(self)
+            self._session.close()
+    
     def test_connection(self) -> bool:
         """Test if token and connection are valid"""
         try:
-            # Try to upload a minimal log
-            self.upload_log(
-                namespace="test",
-                level="info",
-                message="Connection test"
+            # Try to upload a minimal log; only the status matters
+            self._upload_single_log(
+                LogEntry(namespace="test", level="info", message="Connection test"),
+                decode_response=False
             )
             return True
         except Exception:
             return False
+
+
+# Clients whose enqueue_record() buffer may still hold records
+_clients_with_pending: "weakref.WeakSet[MonkAIClient]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_pending_at_exit() -> None:
+    for client in list(_clients_with_pending):
+        try:
+            client.flush_pending()
+        except Exception as e:
+            logger.error("MonkAI: flushing buffered records at exit failed: %s", e)
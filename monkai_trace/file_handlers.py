@@ -2,16 +2,133 @@
 
 import json
 import logging
-from typing import List, Union
+from typing import Any, Iterator, List, TextIO, Union
 from pathlib import Path
 from .models import ConversationRecord, LogEntry
 
 logger = logging.getLogger(__name__)
 
+_READ_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class _JsonScanner:
+    """Decode JSON values one at a time from a text stream, reading it in blocks"""
+    
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._decoder = json.JSONDecoder()
+        self._read_size = _READ_SIZE
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+    
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self._read_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at end of file)"""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON, found {found or 'end of file'!r}")
+        self._pos += 1
+    
+    def value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                # Grow reads while a single value spans many blocks
+                self._read_size *= 2
+                continue
+            # A number cut at the block edge decodes as its prefix ("2.5" of
+            # "2.5e10"); only accept it once something other than a number
+            # character follows it
+            buf, tail = self._buf, end
+            while tail < len(buf) and buf[tail] in _NUMBER_CHARS:
+                tail += 1
+            if tail == len(buf) and self._fill():
+                continue
+            self._pos = end
+            self._read_size = _READ_SIZE
+            return obj
+
+
+def _iter_json_array(file_path: Union[str, Path], key: str) -> Iterator[Any]:
+    """Yield the items of ``{key: [...]}`` or of a top-level array, one at a time"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        scanner = _JsonScanner(f)
+        first = scanner.peek()
+        if first == "{":
+            scanner.expect("{")
+            while True:
+                if scanner.peek() != '"':
+                    raise ValueError(f"JSON must contain '{key}' key or be an array")
+                name = scanner.value()
+                scanner.expect(":")
+                if name == key:
+                    break
+                scanner.value()  # skip sibling values such as metadata
+                if scanner.peek() == ",":
+                    scanner.expect(",")
+        elif first != "[":
+            raise ValueError(f"JSON must contain '{key}' key or be an array")
+        
+        scanner.expect("[")
+        if scanner.peek() == "]":
+            return
+        while True:
+            yield scanner.value()
+            if scanner.peek() == "]":
+                return
+            scanner.expect(",")
+
 
 class FileHandler:
     """Handle JSON file parsing and validation"""
     
+    @staticmethod
+    def iter_records_from_json(file_path: Union[str, Path]) -> Iterator[ConversationRecord]:
+        """
+        Stream conversation records from a JSON file without loading it whole.
+        Supports {"records": [...]} and a direct array.
+        
+        Args:
+            file_path: Path to JSON file with records
+            
+        Yields:
+            Validated ConversationRecord objects (invalid ones are skipped)
+        """
+        for record_data in _iter_json_array(file_path, 'records'):
+            try:
+                yield ConversationRecord(**record_data)
+            except Exception as e:
+                logger.warning(f"Skipping invalid record: {e}")
+    
     @staticmethod
     def load_records_from_json(file_path: Union[str, Path]) -> List[ConversationRecord]:
         """
@@ -24,28 +141,27 @@ class FileHandler:
         Returns:
             List of validated ConversationRecord objects
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Handle both {"records": [...]} and direct array
-        if isinstance(data, dict) and 'records' in data:
-            records_data = data['records']
-        elif isinstance(data, list):
-            records_data = data
-        else:
-            raise ValueError("JSON must contain 'records' key or be an array")
+        return list(FileHandler.iter_records_from_json(file_path))
+    
+    @staticmethod
+    def iter_logs_from_json(file_path: Union[str, Path]) -> Iterator[LogEntry]:
+        """
+        Stream logs from a JSON file without loading it whole.
+        Supports {"logs": [...]} and a direct array.
         
-        # Parse and validate each record
-        records = []
-        for record_data in records_data:
+        Args:
+            file_path: Path to JSON file with logs
+            
+        Yields:
+            Validated LogEntry objects (invalid ones are skipped)
+        """
+        for log_data in _iter_json_array(file_path, 'logs'):
             try:
-                record = ConversationRecord(**record_data)
-                records.append(record)
+                # Remove 'id' if present (server-generated)
+                log_data.pop('id', None)
+                yield LogEntry(**log_data)
             except Exception as e:
-                logger.warning(f"Skipping invalid record: {e}")
-                continue
-        
-        return records
+                logger.warning(f"Skipping invalid log: {e}")
     
     @staticmethod
     def load_logs_from_json(file_path: Union[str, Path]) -> List[LogEntry]:
@@ -59,30 +175,7 @@ class FileHandler:
         Returns:
             List of validated LogEntry objects
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Handle both {"logs": [...]} and direct array
-        if isinstance(data, dict) and 'logs' in data:
-            logs_data = data['logs']
-        elif isinstance(data, list):
-            logs_data = data
-        else:
-            raise ValueError("JSON must contain 'logs' key or be an array")
-        
-        # Parse and validate each log
-        logs = []
-        for log_data in logs_data:
-            try:
-                # Remove 'id' if present (server-generated)
-                log_data.pop('id', None)
-                log = LogEntry(**log_data)
-                logs.append(log)
-            except Exception as e:
-                logger.warning(f"Skipping invalid log: {e}")
-                continue
-        
-        return logs
+        return list(FileHandler.iter_logs_from_json(file_path))
     
     @staticmethod
     def validate_json_structure(file_path: Union[str, Path], 
@@ -10,7 +10,6 @@ Automatically tracks:
 """
 
 from typing import Any, Optional, Dict, List
-from datetime import datetime
 import uuid
 import logging
 
@@ -24,6 +23,7 @@ except ImportError:
 
 from ..client import MonkAIClient
 from ..models import ConversationRecord, Message, Transfer, TokenUsage
+from .._clock import utc_now_iso
 
 logger = logging.getLogger(__name__)
 
@@ -90,7 +90,7 @@ class MonkAIAgentHooks:
         }
         self._batch_buffer: List[ConversationRecord] = []
         
-        logger.info(f"MonkAIAgentHooks initialized for namespace: {namespace}")
+        logger.info("MonkAIAgentHooks initialized for namespace: %s", namespace)
     
     def on_agent_start(self, agent: Agent, context: Optional[AgentContext] = None) -> None:
         """
@@ -114,7 +114,7 @@ class MonkAIAgentHooks:
             estimated_tokens = len(agent.instructions.split()) * 1.3  # Rough estimate
             self._token_counts["memory"] = int(estimated_tokens)
         
-        logger.debug(f"Agent started: {agent.name} (session: {self._session_id})")
+        logger.debug("Agent started: %s (session: %s)", agent.name, self._session_id)
     
     def on_agent_end(
         self,
@@ -185,7 +185,7 @@ class MonkAIAgentHooks:
             role=message.get("role", "user"),
             content=message.get("content", ""),
             sender=message.get("sender", agent.name),
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=utc_now_iso()
         )
         
         self._messages.append(msg)
@@ -198,7 +198,7 @@ class MonkAIAgentHooks:
             word_count = len(msg.content.split()) if msg.content else 0
             self._token_counts["output"] += int(word_count * 1.3)
         
-        logger.debug(f"Message tracked: {msg.role} ({len(msg.content)} chars)")
+        logger.debug("Message tracked: %s (%d chars)", msg.role, len(msg.content))
     
     def on_handoff(
         self,
@@ -216,7 +216,7 @@ class MonkAIAgentHooks:
             context: Optional agent context
             reason: Optional reason for handoff
         """
-        timestamp = datetime.utcnow().isoformat()
+        timestamp = utc_now_iso()
         
         transfer = Transfer(
             from_agent=from_agent.name,
@@ -246,7 +246,7 @@ class MonkAIAgentHooks:
         )
         self._messages.append(msg)
         
-        logger.info(f"Handoff: {from_agent.name} → {to_agent.name}")
+        logger.info("Handoff: %s → %s", from_agent.name, to_agent.name)
     
     def on_tool_start(
         self,
@@ -270,7 +270,7 @@ class MonkAIAgentHooks:
                 "name": tool_name,
                 "arguments": tool_input
             }],
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=utc_now_iso()
         )
         
         self._messages.append(msg)
@@ -279,7 +279,7 @@ class MonkAIAgentHooks:
         input_size = len(str(tool_input))
         self._token_counts["process"] += int(input_size / 4)
         
-        logger.debug(f"Tool started: {tool_name}")
+        logger.debug("Tool started: %s", tool_name)
     
     def on_tool_end(
         self,
@@ -299,7 +299,7 @@ class MonkAIAgentHooks:
             role="tool",
             content=f"Tool result: {str(tool_output)[:200]}",
             sender=agent.name,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=utc_now_iso()
         )
         
         self._messages.append(msg)
@@ -308,7 +308,7 @@ class MonkAIAgentHooks:
         output_size = len(str(tool_output))
         self._token_counts["process"] += int(output_size / 4)
         
-        logger.debug(f"Tool ended: {tool_name}")
+        logger.debug("Tool ended: %s", tool_name)
     
     def _flush_batch(self) -> None:
         """Upload batched records to MonkAI."""
@@ -317,10 +317,10 @@ class MonkAIAgentHooks:
         
         try:
             self.client.upload_records_batch(self._batch_buffer)
-            logger.info(f"Uploaded {len(self._batch_buffer)} records to MonkAI")
+            logger.info("Uploaded %d records to MonkAI", len(self._batch_buffer))
             self._batch_buffer = []
         except Exception as e:
-            logger.error(f"Failed to upload batch: {e}")
+            logger.error("Failed to upload batch: %s", e)
     
     def flush(self) -> None:
         """Manually flush any pending records in the batch buffer."""
@@ -1,8 +1,18 @@
 """OpenAI Agents framework integration for MonkAI"""
 
+import asyncio
+import atexit
+import contextvars
+import hashlib
 import logging
-from typing import Any, Optional, Dict, List
-from datetime import datetime
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterator, Optional, Dict, List, Tuple
+from types import SimpleNamespace
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +28,623 @@ except ImportError:
     Tool = Any
     RunContextWrapper = Any
 
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
 from ..client import MonkAIClient
+from ..async_client import AsyncMonkAIClient
 from ..models import ConversationRecord, Message, Transfer, TokenUsage
 from ..session_manager import SessionManager, PersistentSessionManager
-from functools import wraps
+from .._clock import fast_iso as _fast_iso
+from functools import lru_cache, singledispatch, wraps
+
+# Role-presence bits kept per conversation so checks don't rescan messages
+_HAS_USER = 1
+_HAS_ASSISTANT = 2
+_HAS_TOOL = 4
+_ROLE_BITS = {"user": _HAS_USER, "assistant": _HAS_ASSISTANT, "tool": _HAS_TOOL}
+
+
+
+@lru_cache(maxsize=1024)
+def _label(prefix: str, name: str) -> str:
+    """Shared "<prefix><name>" string, so repeated tool/handoff messages reuse one object"""
+    return sys.intern(prefix + name)
+
+
+@singledispatch
+def _extract_user_content(item: Any) -> Optional[str]:
+    """Return the content of a user turn from an input item, or None."""
+    if getattr(item, 'role', None) == 'user':
+        return getattr(item, 'content', str(item))
+    return None
+
+
+@_extract_user_content.register(dict)
+def _(item: dict) -> Optional[str]:
+    return item.get('content', str(item)) if item.get('role') == 'user' else None
+
+
+@_extract_user_content.register(Message)
+def _(item: Message) -> Optional[str]:
+    return item.content if item.role == 'user' else None
+
+
+@_extract_user_content.register(str)
+def _(item: str) -> Optional[str]:
+    return None
+
+
+def _first_user_content(messages: Any) -> Optional[str]:
+    for msg in messages:
+        content = _extract_user_content(msg)
+        if content is not None:
+            return content
+    return None
+
+
+@singledispatch
+def _llm_input_user_content(input_data: Any) -> Optional[str]:
+    """User message in the ``input_data`` passed to on_llm_start, or None."""
+    return str(input_data)
+
+
+@_llm_input_user_content.register(str)
+def _(input_data: str) -> Optional[str]:
+    return input_data
+
+
+@_llm_input_user_content.register(list)
+def _(input_data: list) -> Optional[str]:
+    for item in input_data:
+        content = _extract_user_content(item)
+        if content:
+            return content
+    return None
+
+
+# Sentinel: the source had nothing for this context, try the next one
+_NO_INPUT = object()
+
+
+def _input_source(context: Any) -> Any:
+    value = getattr(context, 'input', None)
+    return str(value) if value else _NO_INPUT
+
+
+def _messages_source(context: Any) -> Any:
+    messages = getattr(context, 'messages', None)
+    return _first_user_content(messages) if messages else _NO_INPUT
+
+
+def _nested_source(context: Any) -> Any:
+    nested = getattr(context, 'context', None)
+    if not nested:
+        return _NO_INPUT
+    value = getattr(nested, 'input', None)
+    if value:
+        return str(value)
+    messages = getattr(nested, 'messages', None)
+    return _first_user_content(messages) if messages else None
+
+
+# Where a run context may carry the user message, in priority order
+_INPUT_SOURCES = (
+    ('input', _input_source),
+    ('messages', _messages_source),
+    ('context', _nested_source),
+)
+_ALL_INPUT_SOURCES = tuple(fn for _, fn in _INPUT_SOURCES)
+
+# Sources that apply to each context class. Only classes that declare their
+# attributes (dataclass or pydantic fields) are narrowed down; instances of
+# dynamic classes such as SimpleNamespace can each carry different attributes.
+_input_resolvers: Dict[type, Tuple[Callable[[Any], Any], ...]] = {}
+
+
+def _declared_input_sources(cls: type) -> Tuple[Callable[[Any], Any], ...]:
+    fields = getattr(cls, '__dataclass_fields__', None)
+    if fields is None:
+        fields = getattr(cls, 'model_fields', None)
+    if not isinstance(fields, dict):
+        return _ALL_INPUT_SOURCES
+    return tuple(fn for attr, fn in _INPUT_SOURCES if attr in fields or hasattr(cls, attr))
+
+
+def _context_user_input(context: Any) -> Optional[str]:
+    """User message carried by the run context itself, if any"""
+    sources = _input_resolvers.get(type(context))
+    if sources is None:
+        sources = _input_resolvers[type(context)] = _declared_input_sources(type(context))
+    for source in sources:
+        content = source(context)
+        if content is not _NO_INPUT:
+            return content
+    return None
+
+
+# Stand-in for context.usage when the runner didn't provide one
+_ZERO_USAGE = SimpleNamespace(input_tokens=0, output_tokens=0, requests=None)
+
+# Rough JSON overhead of a record's fixed fields, and of a message besides its text
+_RECORD_BASE_BYTES = 512
+_MESSAGE_BASE_BYTES = 128
+
+
+def _estimated_bytes(record: ConversationRecord) -> int:
+    """Cheap upper-end estimate of a record's upload size, from its message texts"""
+    msgs = getattr(record, 'msg', None)
+    if isinstance(msgs, Message):
+        msgs = (msgs,)
+    elif not isinstance(msgs, list):
+        return _RECORD_BASE_BYTES
+    size = _RECORD_BASE_BYTES
+    for msg in msgs:
+        content = getattr(msg, 'content', None)
+        size += _MESSAGE_BASE_BYTES
+        if isinstance(content, str):
+            size += len(content)
+        elif content:
+            size += _MESSAGE_BASE_BYTES * len(content)  # structured blocks
+    return size
+
+
+# AsyncMonkAIClient keyword arguments an upload queue builds its client with
+_UploadSettings = Tuple[Tuple[str, Any], ...]
+_QueueKey = Tuple[str, _UploadSettings]
+
+
+def _upload_settings(client: Any) -> _UploadSettings:
+    """Upload options of a sync MonkAIClient, for the async client that uploads on its behalf"""
+    # type() rather than isinstance(): Mock(spec=MonkAIClient) passes isinstance
+    if not issubclass(type(client), MonkAIClient):
+        return ()
+    return (
+        ("base_url", client.base_url),
+        ("timeout", client.timeout),
+        ("max_retries", client.max_retries),
+        ("strict_dedup", client._strict_dedup),
+        ("rules_client", client._rules_client),
+        ("compress_uploads", client._compress_uploads),
+        ("anonymizer_cache_size", client._anonymizer_cache_size),
+    )
+
+
+class _UploadQueue:
+    """
+    Upload queue shared by every MonkAIRunHooks using the same tracer token
+    and upload settings.
+    
+    Records from all hooks instances (and therefore all end users) are coalesced
+    by a single background consumer into one upload per ``max_batch`` records,
+    ``max_batch_bytes`` of estimated payload or ``flush_interval`` seconds,
+    whichever comes first.
+    
+    Queues made by ``instance()`` own their client: it is closed once the last
+    hooks instance using the queue releases it, or by the exit drain.
+    """
+    
+    _instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_QueueKey, _UploadQueue]]" = (
+        weakref.WeakKeyDictionary()
+    )
+    # Records left unsent when their event loop shut down, keyed like the queues.
+    # They are re-queued by the next queue created for that key.
+    _orphans: Dict[_QueueKey, List[ConversationRecord]] = {}
+    
+    def __init__(
+        self,
+        client: AsyncMonkAIClient,
+        tracer_token: str,
+        max_batch: int = 64,
+        flush_interval: float = 0.25,
+        chunk_size: int = 25,
+        max_pending: int = 10_000,
+        max_batch_bytes: int = 256 * 1024,
+        owns_client: bool = False,
+        settings: _UploadSettings = ()
+    ):
+        self.client = client
+        self.tracer_token = tracer_token
+        self.key: _QueueKey = (tracer_token, settings)
+        self.owns_client = owns_client
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.max_batch_bytes = max_batch_bytes
+        self.failures: List[Dict] = []
+        self.dropped_count = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Hooks instances attached to this queue; the last one to release it closes it
+        self._users: "weakref.WeakSet[MonkAIRunHooks]" = weakref.WeakSet()
+    
+    @classmethod
+    def instance(cls, key: _QueueKey) -> "_UploadQueue":
+        """Return the queue for this key on the running loop, creating it (and its client) if needed"""
+        queues = cls._instances.setdefault(asyncio.get_running_loop(), {})
+        queue = queues.get(key)
+        if queue is None:
+            tracer_token, settings = key
+            client = AsyncMonkAIClient(tracer_token=tracer_token, **dict(settings))
+            queue = queues[key] = cls(client, tracer_token, owns_client=True, settings=settings)
+            for record in cls._orphans.pop(key, ()):
+                queue.put(record)
+        return queue
+    
+    @classmethod
+    def lookup(cls, key: _QueueKey) -> Optional["_UploadQueue"]:
+        """Return the existing queue for this key on the running loop, if any"""
+        return cls._instances.get(asyncio.get_running_loop(), {}).get(key)
+    
+    def put(self, record: ConversationRecord) -> None:
+        """Enqueue a record and make sure the consumer is running"""
+        if self._queue.qsize() >= self.max_pending:
+            # Uploads are stalled; drop the oldest record rather than grow without bound
+            self._take()
+            self._queue.task_done()
+            self.dropped_count += 1
+        self._queue.put_nowait(record)
+        self._pending_bytes += _estimated_bytes(record)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+        if self._batch_ready():
+            self._wakeup.set()
+    
+    def _take(self) -> Tuple[ConversationRecord, int]:
+        """Dequeue a record that is known to be there, with its estimated size"""
+        return self._dequeued(self._queue.get_nowait())
+    
+    def _dequeued(self, record: ConversationRecord) -> Tuple[ConversationRecord, int]:
+        size = _estimated_bytes(record)
+        self._pending_bytes -= size
+        return record, size
+    
+    def _batch_ready(self) -> bool:
+        return self._queue.qsize() >= self.max_batch or self._pending_bytes >= self.max_batch_bytes
+    
+    async def join(self) -> None:
+        """Upload everything queued so far, skipping the coalescing delay"""
+        self._wakeup.set()
+        await self._queue.join()
+    
+    def attach(self, hooks: "MonkAIRunHooks") -> None:
+        self._users.add(hooks)
+    
+    async def release(self, hooks: "MonkAIRunHooks") -> None:
+        """Detach ``hooks``; the queue is closed once no hooks instance uses it"""
+        self._users.discard(hooks)
+        await self.join()
+        # Another hooks instance may have attached or queued records meanwhile
+        if not self._users and self._queue.empty():
+            await self.aclose()
+    
+    async def aclose(self) -> None:
+        """Upload what is queued, stop the consumer and close an owned client"""
+        await self.join()
+        queues = self._instances.get(asyncio.get_running_loop(), {})
+        if queues.get(self.key) is self:
+            del queues[self.key]
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.owns_client:
+            await self.client.close()
+    
+    async def _consume(self) -> None:
+        records: List[ConversationRecord] = []
+        try:
+            while True:
+                record, batch_bytes = self._dequeued(await self._queue.get())
+                records = [record]
+                if not self._wakeup.is_set():
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+                while (len(records) < self.max_batch and batch_bytes < self.max_batch_bytes
+                       and not self._queue.empty()):
+                    record, size = self._take()
+                    batch_bytes += size
+                    records.append(record)
+                if self._batch_ready():
+                    self._wakeup.set()
+                try:
+                    await self._upload(records)
+                finally:
+                    for _ in records:
+                        self._queue.task_done()
+                records = []
+        except asyncio.CancelledError:
+            # The loop is going away: keep unsent records for the next loop or
+            # the exit drain instead of silently dropping them.
+            while not self._queue.empty():
+                records.append(self._take()[0])
+                self._queue.task_done()
+            if records:
+                self._orphans.setdefault(self.key, []).extend(records)
+            raise
+    
+    async def _upload(self, records: List[ConversationRecord]) -> None:
+        try:
+            result = await self.client.upload_records_batch(
+                records, chunk_size=self.chunk_size, parallel=True
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Upload failed: %s", e)
+            self.failures.append({'records': len(records), 'error': str(e)})
+            return
+        failures = result.get('failures')
+        if failures:
+            logger.warning(
+                "Uploaded %d records, %d chunk(s) failed: %s",
+                result['total_inserted'], len(failures), failures,
+            )
+            self.failures.extend(failures)
+        else:
+            logger.info("Uploaded %d records", result['total_inserted'])
+
+
+# Hooks instances still alive, drained at interpreter exit
+_live_hooks: "weakref.WeakSet[MonkAIRunHooks]" = weakref.WeakSet()
+
+
+def _orphan_buffer(key: _QueueKey, buffer: Deque[ConversationRecord]) -> None:
+    """Keep records of a collected hooks instance for the next queue or the exit drain"""
+    if buffer:
+        _UploadQueue._orphans.setdefault(key, []).extend(buffer)
+        buffer.clear()
+
+
+async def _drain_all_hooks(hooks: List["MonkAIRunHooks"]) -> None:
+    await asyncio.gather(*(h.aclose() for h in hooks), return_exceptions=True)
+    # Orphaned records whose hooks are gone: upload through a fresh queue
+    for key, records in list(_UploadQueue._orphans.items()):
+        if records:
+            await _UploadQueue.instance(key).aclose()
+
+
+def _drain_at_exit() -> None:
+    """Upload records still buffered or orphaned when the interpreter exits"""
+    orphaned = {key for key, records in _UploadQueue._orphans.items() if records}
+    hooks = [h for h in list(_live_hooks) if h._batch_buffer or h._upload_key in orphaned]
+    if not hooks and not orphaned:
+        return
+    try:
+        asyncio.run(_drain_all_hooks(hooks))
+    except Exception as e:
+        logger.error("Failed to upload pending MonkAI records at exit: %s", e)
+
+
+atexit.register(_drain_at_exit)
+
+
+def _outside_task(value: Optional[str]) -> Optional[str]:
+    """``value`` when not called from an asyncio task (e.g. from another thread), else None"""
+    try:
+        in_task = asyncio.current_task() is not None
+    except RuntimeError:  # no running loop in this thread
+        in_task = False
+    return None if in_task else value
+
+
+def _get_field(obj: Any, attr: str, default: Any = None) -> Any:
+    """Read ``attr`` from an SDK object or its dict form"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(attr, default)
+    return getattr(obj, attr, default)
+
+
+def _to_jsonable(obj: Any) -> Any:
+    """Convert Pydantic objects and other complex types to JSON-serializable values"""
+    if obj is None:
+        return None
+    if isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {k: _to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(item) for item in obj]
+    # Pydantic model
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    # Dataclass or other object with __dict__
+    if hasattr(obj, '__dict__'):
+        return {k: _to_jsonable(v) for k, v in obj.__dict__.items() if not k.startswith('_')}
+    # Fallback to string
+    return str(obj)
+
+
+def _web_search_details(item: Any) -> Dict:
+    action = _get_field(item, 'action')
+    result = _get_field(item, 'result')
+    
+    # Primary: sources are in action.sources (when include param is used)
+    sources = _get_field(action, 'sources')
+    
+    # Fallback: if sources is None, try result as fallback
+    if sources is None and result:
+        sources = (
+            _get_field(result, 'sources') or
+            _get_field(result, 'results') or
+            _get_field(result, 'web_results')
+        )
+        if sources is None and isinstance(result, list):
+            sources = result
+    
+    return {
+        "arguments": {
+            "query": _get_field(action, 'query'),
+            "sources": _to_jsonable(sources) if sources else None,
+        },
+        "result": _to_jsonable(result)
+    }
+
+
+def _file_search_details(item: Any) -> Dict:
+    return {
+        "arguments": {
+            "query": _get_field(item, 'query'),
+            "file_ids": _get_field(item, 'file_ids'),
+        },
+        "result": _get_field(item, 'results')
+    }
+
+
+def _code_interpreter_details(item: Any) -> Dict:
+    return {
+        "arguments": {
+            "code": _get_field(item, 'code'),
+            "language": _get_field(item, 'language', 'python'),
+        },
+        "result": _get_field(item, 'output')
+    }
+
+
+def _computer_details(item: Any) -> Dict:
+    return {
+        "arguments": {
+            "action_type": _get_field(_get_field(item, 'action'), 'type'),
+        },
+        "result": _get_field(item, 'output')
+    }
+
+
+# Internal tool item type -> (tool name, details parser); one lookup per item
+_INTERNAL_TOOLS: Dict[str, Tuple[str, Callable[[Any], Dict]]] = {
+    'web_search_call': ('web_search', _web_search_details),
+    'file_search_call': ('file_search', _file_search_details),
+    'code_interpreter_call': ('code_interpreter', _code_interpreter_details),
+    'computer_call': ('computer_use', _computer_details),
+}
+
+def _iter_quietly(iterable: Any) -> Iterator[Any]:
+    """Yield from ``iterable``, stopping silently if iterating it fails"""
+    try:
+        yield from iterable
+    except Exception:
+        return
+
+
+# Encoding used when the agent's model isn't a known model name
+_DEFAULT_ENCODING = "o200k_base"
+# tiktoken encoding per model name (None: no usable encoding, estimate instead)
+_encodings: Dict[Optional[str], Any] = {}
+
+
+def _encoding_for(model: Optional[str]) -> Any:
+    """tiktoken encoding for ``model``, looked up once per model name"""
+    try:
+        return _encodings[model]
+    except KeyError:
+        pass
+    encoding = None
+    if tiktoken is not None:
+        try:
+            encoding = (
+                tiktoken.encoding_for_model(model) if model
+                else tiktoken.get_encoding(_DEFAULT_ENCODING)
+            )
+        except KeyError:
+            encoding = _encoding_for(None) if model else None
+        except Exception as e:
+            # e.g. the BPE file can't be downloaded in an offline environment
+            logger.warning("tiktoken encoding unavailable, estimating process tokens: %s", e)
+    _encodings[model] = encoding
+    return encoding
+
+
+def _count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Exact token count of ``text`` when tiktoken is installed, else ~4 chars per token"""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode_ordinary(text))
+
+
+# Where a hook's output may carry its response items, in lookup order
+_RAW_ITEM_ATTRS = ('raw_items', 'new_items', 'items')
+_NESTED_ITEM_ATTRS = ('raw_item', 'item', 'data', 'content')
+
+
+# Tool results shorter than this cost less than a reference to them
+_DEDUPE_MIN_CHARS = 64
+_DEDUPE_MAX_ENTRIES = 512
+
+
+class _SessionState:
+    """In-flight conversation of one user on a hooks instance"""
+    
+    __slots__ = (
+        "session_id", "session_seen_at", "messages", "roles_present", "transfers",
+        "system_prompt_tokens", "context_tokens", "pending_user_input",
+        "user_input", "skip_auto_flush", "last_record",
+        "tool_result_seen", "tool_result_count", "transfer_edges",
+    )
+    
+    def __init__(self):
+        self.session_id: Optional[str] = None
+        # time.monotonic() at which session_id was last resolved or reused
+        self.session_seen_at: float = 0.0
+        self.messages: List[Message] = []
+        self.roles_present: int = 0
+        self.transfers: List[Transfer] = []
+        self.system_prompt_tokens: int = 0
+        self.context_tokens: int = 0
+        self.pending_user_input: Optional[str] = None
+        self.user_input: Optional[str] = None
+        self.skip_auto_flush: bool = False
+        # Record built by on_agent_end, kept while run_with_tracking still
+        # needs to attach internal tools to it
+        self.last_record: Optional[ConversationRecord] = None
+        # Tool-result digests of this conversation -> ordinal of the first
+        # result with that content (only used with dedupe_tool_results)
+        self.tool_result_seen: Dict[Tuple[str, bytes], int] = {}
+        self.tool_result_count: int = 0
+        # (from, to) -> the transfer already recorded for that edge
+        # (only used with dedupe_transfers)
+        self.transfer_edges: Dict[Tuple[str, str], Transfer] = {}
+    
+    def append(self, msg: Message) -> None:
+        """Append a message to the conversation and record its role"""
+        self.messages.append(msg)
+        self.roles_present |= _ROLE_BITS.get(msg.role, 0)
+    
+    def dedupe_tool_result(self, tool_name: str, result: str) -> str:
+        """Return ``result``, or a reference to an earlier identical result of the same tool"""
+        self.tool_result_count += 1
+        if len(result) < _DEDUPE_MIN_CHARS:
+            return result
+        key = (tool_name, hashlib.blake2b(result.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+        first = self.tool_result_seen.get(key)
+        if first is not None:
+            return f"[duplicate of tool result #{first}]"
+        if len(self.tool_result_seen) >= _DEDUPE_MAX_ENTRIES:
+            del self.tool_result_seen[next(iter(self.tool_result_seen))]  # FIFO eviction
+        self.tool_result_seen[key] = self.tool_result_count
+        return result
+
+
+def _state_property(name: str, doc: str) -> property:
+    """Expose a _SessionState field of the current user on the hooks instance"""
+    def fget(self):
+        return getattr(self._active_state(), name)
+    
+    def fset(self, value):
+        setattr(self._active_state(), name, value)
+    
+    return property(fget, fset, doc=doc)
 
 
 class MonkAIRunHooks(RunHooks):
@@ -34,6 +657,12 @@ class MonkAIRunHooks(RunHooks):
     - Tool calls
     - Per-agent usage statistics
     
+    Conversation state is kept per user (``set_user_id()`` or
+    ``context.user_id``), so one instance can serve several users at once.
+    Records are uploaded through a queue shared by all hooks using the same
+    tracer token, so concurrent users are shipped together in batched requests.
+    Call ``flush()`` or ``aclose()`` to wait for pending uploads.
+    
     Usage:
         hooks = MonkAIRunHooks(
             tracer_token="tk_your_token",
@@ -42,6 +671,26 @@ class MonkAIRunHooks(RunHooks):
         result = await Runner.run(agent, "Hello", hooks=hooks)
     """
     
+    # Per-instance state lives in slots. RunHooks itself has no __slots__, so
+    # instances keep a (normally empty) __dict__ and weakref support.
+    __slots__ = (
+        "client", "_upload_key", "_executor", "namespace", "auto_upload",
+        "estimate_system_tokens", "batch_size", "session_manager",
+        "_user_id_var", "_last_user_id", "_user_name_var", "_external_user_name",
+        "_user_channel_var", "_external_user_channel",
+        "_current_session", "_sessions", "_active_key", "_batch_buffer",
+        "_dropped_count", "dedupe_tool_results", "dedupe_transfers", "_now",
+    )
+    
+    # Process-token counts keyed by (id(instructions), model). Entries keep the
+    # string alive, so an id can't be recycled by another object while cached.
+    _prompt_token_cache: Dict[Tuple[int, Optional[str]], Tuple[str, int]] = {}
+    _PROMPT_TOKEN_CACHE_SIZE = 256
+    
+    # Shared instances handed out by get_or_create(), per (tracer_token, namespace)
+    _shared_instances: Dict[Tuple[str, str], "MonkAIRunHooks"] = {}
+    _shared_lock = threading.Lock()
+    
     def __init__(
         self,
         tracer_token: str,
@@ -49,9 +698,13 @@ class MonkAIRunHooks(RunHooks):
         auto_upload: bool = True,
         estimate_system_tokens: bool = True,
         batch_size: int = 10,
+        max_buffer: int = 10_000,
         session_manager: Optional[SessionManager] = None,
         inactivity_timeout: int = 120,
-        persistent_sessions: bool = False
+        persistent_sessions: bool = False,
+        dedupe_tool_results: bool = False,
+        dedupe_transfers: bool = False,
+        client: Optional[MonkAIClient] = None
     ):
         """
         Initialize MonkAI tracking hooks.
@@ -62,11 +715,23 @@ class MonkAIRunHooks(RunHooks):
             auto_upload: Automatically upload after agent_end (default: True)
             estimate_system_tokens: Estimate process_tokens from instructions (default: True)
             batch_size: Number of records to batch before upload
+            max_buffer: Maximum records held before upload; the oldest are dropped beyond this
             session_manager: Custom SessionManager instance (optional)
             inactivity_timeout: Seconds of inactivity before new session (default: 120)
             persistent_sessions: Use server-side session persistence (default: False).
                 When True, sessions are resolved via the MonkAI backend database,
                 ensuring continuity across stateless environments (REST APIs, serverless).
+            dedupe_tool_results: Replace a tool result identical to an earlier
+                one from the same tool in the conversation with a short
+                ``[duplicate of tool result #N]`` reference (default: False)
+            dedupe_transfers: Record repeated handoffs between the same two
+                agents in a conversation as one transfer with a ``count`` and
+                the latest timestamp (default: False)
+            client: MonkAIClient to use for session lookups (optional; one is
+                created from ``tracer_token`` by default). Uploads go through
+                an async client built from its ``base_url``, anonymization
+                rules, ``strict_dedup``, ``compress_uploads``,
+                ``anonymizer_cache_size``, timeout and retry settings.
         """
         if not OPENAI_AGENTS_AVAILABLE:
             raise ImportError(
@@ -74,11 +739,17 @@ class MonkAIRunHooks(RunHooks):
                 "Install it with: pip install openai-agents-python"
             )
         
-        self.client = MonkAIClient(tracer_token=tracer_token)
-        self.namespace = namespace
+        self.client = client if client is not None else MonkAIClient(tracer_token=tracer_token)
+        # Hooks with the same token and upload settings share an upload queue
+        self._upload_key: _QueueKey = (tracer_token, _upload_settings(self.client))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Interned so records from hooks sharing a namespace share the string
+        self.namespace = sys.intern(namespace)
         self.auto_upload = auto_upload
         self.estimate_system_tokens = estimate_system_tokens
         self.batch_size = batch_size
+        self.dedupe_tool_results = dedupe_tool_results
+        self.dedupe_transfers = dedupe_transfers
         
         # Session management
         if session_manager:
@@ -88,24 +759,127 @@ class MonkAIRunHooks(RunHooks):
                 client=self.client,
                 inactivity_timeout=inactivity_timeout
             )
-            logger.info(f"Using PersistentSessionManager (timeout: {inactivity_timeout}s)")
+            logger.info("Using PersistentSessionManager (timeout: %ss)", inactivity_timeout)
         else:
             self.session_manager = SessionManager(inactivity_timeout)
         
-        self._current_user_id: Optional[str] = None
+        # set_user_id()/set_user_name()/set_user_channel() are scoped to the
+        # calling task, so concurrent runs for different users don't overwrite
+        # each other. The last values set only cover callers outside any task
+        # (e.g. other threads); a task never sees another task's user.
+        self._user_id_var: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar(
+            f"monkai_user_id_{id(self):x}", default=None
+        )
+        self._last_user_id: Optional[str] = None
+        self._user_name_var: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar(
+            f"monkai_user_name_{id(self):x}", default=None
+        )
         self._external_user_name: Optional[str] = None
+        self._user_channel_var: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar(
+            f"monkai_user_channel_{id(self):x}", default=None
+        )
         self._external_user_channel: Optional[str] = None
         
-        # Track conversation state
+        # Track conversation state, per user; _current_session is the last
+        # session resolved by on_agent_start, for any user
         self._current_session: Optional[str] = None
-        self._messages: List[Message] = []
-        self._transfers: List[Transfer] = []
-        self._system_prompt_tokens: int = 0
-        self._context_tokens: int = 0
-        self._batch_buffer: List[ConversationRecord] = []
-        self._pending_user_input: Optional[str] = None
-        self._user_input: Optional[str] = None
-        self._skip_auto_flush: bool = False
+        self._sessions: Dict[str, _SessionState] = {}
+        self._active_key: str = "anonymous"
+        self._batch_buffer: Deque[ConversationRecord] = deque(maxlen=max_buffer)
+        self._dropped_count: int = 0
+        # Clock for session reuse; tests swap it (and the session manager's)
+        # for a fake one instead of sleeping
+        self._now = time.monotonic
+        
+        _live_hooks.add(self)
+        # Records still buffered when the hooks are garbage collected are
+        # handed to the upload queue's orphans rather than lost. At exit the
+        # drain handles live hooks itself.
+        weakref.finalize(self, _orphan_buffer, self._upload_key, self._batch_buffer).atexit = False
+    
+    @classmethod
+    def get_or_create(cls, tracer_token: str, namespace: str, **kwargs) -> "MonkAIRunHooks":
+        """
+        Return the hooks instance shared by every caller with this token and
+        namespace, creating it on first use.
+        
+        Use this instead of constructing hooks per request (e.g. in a web
+        handler) so requests share one HTTP connection pool, session manager
+        and upload buffer. Conversation state is kept per user and
+        ``set_user_id()`` is scoped to the calling task, so concurrent
+        requests don't mix. ``kwargs`` only apply when the instance is created.
+        
+        Usage:
+            hooks = MonkAIRunHooks.get_or_create("tk_your_token", "customer-support")
+            hooks.set_user_id(request_user_id)
+            result = await Runner.run(agent, user_message, hooks=hooks)
+        """
+        key = (tracer_token, namespace)
+        hooks = cls._shared_instances.get(key)
+        if hooks is None:
+            with cls._shared_lock:
+                hooks = cls._shared_instances.get(key)
+                if hooks is None:
+                    hooks = cls._shared_instances[key] = cls(tracer_token, namespace, **kwargs)
+        return hooks
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Forget the instances shared by get_or_create() (they are not closed)"""
+        with cls._shared_lock:
+            cls._shared_instances.clear()
+    
+    # Conversation fields of the user the last hook call or set_user_id() was for
+    _messages = _state_property("messages", "Messages captured so far")
+    _roles_present = _state_property("roles_present", "Role bits of the captured messages")
+    _transfers = _state_property("transfers", "Handoffs captured so far")
+    _system_prompt_tokens = _state_property("system_prompt_tokens", "Estimated process tokens")
+    _context_tokens = _state_property("context_tokens", "Memory tokens")
+    _pending_user_input = _state_property("pending_user_input", "Input set via set_user_input()")
+    _user_input = _state_property("user_input", "User message of the conversation")
+    _skip_auto_flush = _state_property("skip_auto_flush", "Defer flushing to run_with_tracking()")
+    
+    @property
+    def _current_user_id(self) -> Optional[str]:
+        """User set via set_user_id() for the current task"""
+        return self._user_id_var.get() or _outside_task(self._last_user_id)
+    
+    @_current_user_id.setter
+    def _current_user_id(self, user_id: Optional[str]) -> None:
+        self._user_id_var.set(user_id)
+        self._last_user_id = user_id
+    
+    @property
+    def _current_user_name(self) -> Optional[str]:
+        """User name set via set_user_name() for the current task"""
+        return self._user_name_var.get() or _outside_task(self._external_user_name)
+    
+    @property
+    def _current_user_channel(self) -> Optional[str]:
+        """Channel set via set_user_channel() for the current task"""
+        return self._user_channel_var.get() or _outside_task(self._external_user_channel)
+    
+    def _user_key(self, context: Any = None) -> str:
+        """User whose conversation a hook call belongs to"""
+        user_id = getattr(context, 'user_id', None)
+        if user_id and isinstance(user_id, str):
+            return user_id
+        return self._current_user_id or "anonymous"
+    
+    def _release_state(self, context: Any = None) -> None:
+        """Forget the conversation state of the user behind `context`"""
+        self._sessions.pop(self._user_key(context), None)
+    
+    def _state(self, context: Any = None) -> _SessionState:
+        """Conversation state of the user behind `context`, created on first use"""
+        self._active_key = self._user_key(context)
+        return self._active_state()
+    
+    def _active_state(self) -> _SessionState:
+        state = self._sessions.get(self._active_key)
+        if state is None:
+            state = self._sessions[self._active_key] = _SessionState()
+        return state
     
     async def on_agent_start(
         self,
@@ -113,75 +887,83 @@ class MonkAIRunHooks(RunHooks):
         agent: Agent
     ) -> None:
         """Called when agent starts processing"""
-        logger.debug(f"Agent '{agent.name}' started")
-        
-        # Estimate system prompt tokens if enabled
-        if self.estimate_system_tokens and hasattr(agent, 'instructions') and agent.instructions:
-            # Rough estimate: ~4 chars per token
-            self._system_prompt_tokens = len(agent.instructions) // 4
-        
         # Determinar user_id (priority: context > attribute > default)
-        user_id = None
-        if hasattr(context, 'user_id') and context.user_id:
-            user_id = context.user_id
-        elif self._current_user_id:
-            user_id = self._current_user_id
-        else:
-            user_id = "anonymous"  # Fallback
-        
-        # Get or create session with timeout logic
-        self._current_session = self.session_manager.get_or_create_session(
-            user_id=user_id,
-            namespace=self.namespace
-        )
-        
-        logger.debug(f"Session: {self._current_session} (user: {user_id})")
+        user_id = self._user_key(context)
+        state = self._state(context)
+        
+        # Estimate system prompt tokens if enabled (dynamic, callable instructions are skipped)
+        instructions = getattr(agent, 'instructions', None)
+        if self.estimate_system_tokens and instructions and isinstance(instructions, str):
+            model = getattr(agent, 'model', None)
+            state.system_prompt_tokens = self._estimate_prompt_tokens(
+                instructions, model if isinstance(model, str) else None
+            )
         
-        # Extract user message - most efficient approach
-        user_message_content = None
+        # Get or create session with timeout logic. Agents started later in the
+        # same conversation (after a handoff) reuse its session while it is
+        # within the inactivity timeout, only refreshing its activity.
+        # The persistent manager may call the backend, so it runs on a worker
+        # thread instead of the loop.
+        now = self._now()
+        if state.session_id is not None and now - state.session_seen_at < self.session_manager.inactivity_timeout:
+            session_id = state.session_id
+            self.session_manager.update_activity(user_id)
+        elif isinstance(self.session_manager, PersistentSessionManager):
+            session_id = await asyncio.get_running_loop().run_in_executor(
+                self._session_executor(),
+                self.session_manager.get_or_create_session,
+                user_id,
+                self.namespace,
+            )
+        else:
+            session_id = self.session_manager.get_or_create_session(
+                user_id=user_id,
+                namespace=self.namespace
+            )
+        state.session_id = self._current_session = session_id
+        state.session_seen_at = now
         
+        # Extract user message
         # Priority 1: Use stored pending input (set via set_user_input method)
-        if self._pending_user_input:
-            user_message_content = self._pending_user_input
-            self._pending_user_input = None  # Clear after use
-        
-        # Priority 2: Check context.input (if available)
-        elif hasattr(context, 'input') and context.input:
-            user_message_content = str(context.input)
-        
-        # Priority 3: Check context.messages list (if available)
-        elif hasattr(context, 'messages') and context.messages:
-            # Look for the first user message
-            for msg in context.messages:
-                if hasattr(msg, 'role') and msg.role == 'user':
-                    user_message_content = msg.content if hasattr(msg, 'content') else str(msg)
-                    break
-                elif isinstance(msg, dict) and msg.get('role') == 'user':
-                    user_message_content = msg.get('content', str(msg))
-                    break
-        
-        # Priority 4: Check context.context (nested context)
-        elif hasattr(context, 'context') and context.context:
-            nested = context.context
-            if hasattr(nested, 'input') and nested.input:
-                user_message_content = str(nested.input)
-            elif hasattr(nested, 'messages') and nested.messages:
-                for msg in nested.messages:
-                    if hasattr(msg, 'role') and msg.role == 'user':
-                        user_message_content = msg.content if hasattr(msg, 'content') else str(msg)
-                        break
+        if state.pending_user_input:
+            user_message_content = state.pending_user_input
+            state.pending_user_input = None  # Clear after use
+        else:
+            # Priorities 2-4: context.input, context.messages, context.context
+            user_message_content = _context_user_input(context)
         
         # Add user message if found
         if user_message_content:
-            self._user_input = user_message_content  # Store for later use in on_agent_end
-            self._messages.append(Message(
+            state.user_input = user_message_content  # Store for later use in on_agent_end
+            state.append(Message(
                 role="user",
                 content=user_message_content,
                 sender="user"
             ))
-            logger.debug(f"Captured user message: {user_message_content[:50]}...")
         else:
             logger.warning("No user message captured. Consider using hooks.set_user_input() or MonkAIRunHooks.run_with_tracking()")
+        
+        # One line per event: agent, session and captured input together
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Agent '%s' started (session: %s, user: %s, input: %.50s)",
+                agent.name, state.session_id, user_id, user_message_content,
+            )
+    
+    @classmethod
+    def _estimate_prompt_tokens(cls, instructions: str, model: Optional[str] = None) -> int:
+        """Process tokens of the instructions (exact with tiktoken), cached per string and model"""
+        cache = cls._prompt_token_cache
+        key = (id(instructions), model)
+        cached = cache.get(key)
+        if cached is not None and cached[0] is instructions:
+            return cached[1]
+        
+        tokens = _count_tokens(instructions, model)
+        if len(cache) >= cls._PROMPT_TOKEN_CACHE_SIZE:
+            del cache[next(iter(cache))]  # FIFO eviction
+        cache[key] = (instructions, tokens)
+        return tokens
     
     def set_user_input(self, user_input: str) -> None:
         """
@@ -193,7 +975,7 @@ class MonkAIRunHooks(RunHooks):
             hooks.set_user_input("Hello, how can you help?")
             result = await Runner.run(agent, "Hello, how can you help?", hooks=hooks)
         """
-        self._pending_user_input = user_input
+        self._state().pending_user_input = user_input
     
     def set_user_id(self, user_id: str) -> None:
         """
@@ -205,8 +987,13 @@ class MonkAIRunHooks(RunHooks):
             hooks = MonkAIRunHooks(...)
             hooks.set_user_id("user-12345")  # ID do MongoDB, WhatsApp, etc.
             result = await Runner.run(agent, "Hello", hooks=hooks)
+        
+        O valor vale para a task asyncio atual (e as tasks criadas a partir
+        dela), então tasks concorrentes podem atender usuários diferentes
+        com a mesma instância de hooks.
         """
         self._current_user_id = user_id
+        self._active_key = self._user_key()
     
     def set_user_name(self, user_name: str) -> None:
         """
@@ -220,7 +1007,10 @@ class MonkAIRunHooks(RunHooks):
             hooks.set_user_name("João Silva")
             hooks.set_user_channel("whatsapp")
             result = await Runner.run(agent, "Hello", hooks=hooks)
+        
+        Como set_user_id(), vale para a task asyncio atual.
         """
+        self._user_name_var.set(user_name)
         self._external_user_name = user_name
     
     def set_user_channel(self, channel: str) -> None:
@@ -233,7 +1023,10 @@ class MonkAIRunHooks(RunHooks):
             hooks.set_user_id("user-12345")
             hooks.set_user_channel("whatsapp")
             result = await Runner.run(agent, "Hello", hooks=hooks)
+        
+        Como set_user_id(), vale para a task asyncio atual.
         """
+        self._user_channel_var.set(channel)
         self._external_user_channel = channel
     
     async def on_agent_end(
@@ -243,7 +1036,7 @@ class MonkAIRunHooks(RunHooks):
         output: Any
     ) -> None:
         """Called when agent completes - upload conversation to MonkAI"""
-        logger.debug(f"Agent '{agent.name}' ended")
+        state = self._state(context)
         
         # Capture internal tools from response raw_items (web_search, file_search, etc.)
         self._capture_internal_tools(output, context, agent.name)
@@ -251,42 +1044,36 @@ class MonkAIRunHooks(RunHooks):
         # Extract usage statistics
         usage = getattr(context, 'usage', None)
         if usage is None:
-            logger.warning(f"context.usage is None for '{agent.name}'")
-            # Create token usage with defaults
-            token_usage = TokenUsage(
-                input_tokens=0,
-                output_tokens=0,
-                process_tokens=self._system_prompt_tokens,
-                memory_tokens=self._context_tokens
-            )
-        else:
-            token_usage = TokenUsage.from_openai_agents_usage(
-                usage,
-                system_prompt_tokens=self._system_prompt_tokens,
-                context_tokens=self._context_tokens
-            )
+            logger.warning("context.usage is None for '%s'", agent.name)
+            usage = _ZERO_USAGE
+        token_usage = TokenUsage.from_openai_agents_usage(
+            usage,
+            system_prompt_tokens=state.system_prompt_tokens,
+            context_tokens=state.context_tokens
+        )
         
-        # Build messages list - ensure we have user and assistant messages
-        messages = self._messages.copy() if self._messages else []
+        # Take ownership of the conversation's messages/transfers; the next
+        # conversation starts with fresh lists instead of a copy being made.
+        messages = state.messages
+        transfers = state.transfers or None
+        state.messages = []
+        state.transfers = []
+        if state.tool_result_count:
+            state.tool_result_seen = {}
+            state.tool_result_count = 0
+        if state.transfer_edges:
+            state.transfer_edges = {}
         
         # Ensure we have user message (guarantee from on_agent_end)
-        has_user_message = any(
-            msg.role == 'user' if isinstance(msg, Message) else 
-            msg.get('role') == 'user' if isinstance(msg, dict) else False 
-            for msg in messages
-        )
+        has_user_message = state.roles_present & _HAS_USER
         
-        # Add user message if not present but we have _user_input
-        if not has_user_message and self._user_input:
-            messages.insert(0, Message(role="user", content=self._user_input, sender="user"))
-            logger.debug(f"Added user message from backup: {self._user_input[:50]}...")
+        # Add user message if not present but we have user_input (built as a
+        # new list rather than insert(0, ...), which shifts every message)
+        if not has_user_message and state.user_input:
+            messages = [Message(role="user", content=state.user_input, sender="user"), *messages]
         
         # Ensure we have assistant message
-        has_assistant_message = any(
-            msg.role == 'assistant' if isinstance(msg, Message) else 
-            msg.get('role') == 'assistant' if isinstance(msg, dict) else False 
-            for msg in messages
-        )
+        has_assistant_message = state.roles_present & _HAS_ASSISTANT
         
         if not has_assistant_message:
             messages.append(Message(role="assistant", content=str(output), sender=agent.name))
@@ -294,42 +1081,52 @@ class MonkAIRunHooks(RunHooks):
         # Extract model name from agent
         model_name = getattr(agent, 'model', None)
         if model_name and not isinstance(model_name, str):
-            model_name = str(model_name)
+            # str() builds a new string per record; buffered records share one
+            model_name = sys.intern(str(model_name))
 
         # Create conversation record with external_user_id from set_user_id()
         record = ConversationRecord(
             namespace=self.namespace,
             agent=agent.name,
-            session_id=self._current_session,
+            session_id=state.session_id,
             msg=messages,
             input_tokens=token_usage.input_tokens,
             output_tokens=token_usage.output_tokens,
             process_tokens=token_usage.process_tokens,
             memory_tokens=token_usage.memory_tokens,
             total_tokens=token_usage.total_tokens,
-            transfers=self._transfers.copy() if self._transfers else None,
-            inserted_at=datetime.utcnow().isoformat(),
+            transfers=transfers,
+            inserted_at=_fast_iso(time.time_ns()),
             external_user_id=self._current_user_id,  # ID do usuário definido via set_user_id()
-            external_user_name=self._external_user_name,  # Nome do usuário definido via set_user_name()
-            external_user_channel=self._external_user_channel,  # Canal definido via set_user_channel()
+            external_user_name=self._current_user_name,  # Nome do usuário definido via set_user_name()
+            external_user_channel=self._current_user_channel,  # Canal definido via set_user_channel()
             model=model_name
         )
         
         # Upload or batch
         if self.auto_upload:
+            if len(self._batch_buffer) == self._batch_buffer.maxlen:
+                self._dropped_count += 1  # append evicts the oldest record
             self._batch_buffer.append(record)
             # Skip auto-flush if using run_with_tracking (will flush after capturing internal tools)
-            if not self._skip_auto_flush and len(self._batch_buffer) >= self.batch_size:
+            if not state.skip_auto_flush and len(self._batch_buffer) >= self.batch_size:
                 await self._flush_batch()
         
-        # Reset state for next conversation
-        self._messages.clear()
-        self._transfers.clear()
-        self._system_prompt_tokens = 0
-        self._context_tokens = 0
-        self._user_input = None
+        # Reset state for next conversation. run_with_tracking still needs the
+        # record for internal tools; otherwise the user's state can go.
+        if state.skip_auto_flush:
+            state.last_record = record
+            state.roles_present = 0
+            state.system_prompt_tokens = 0
+            state.context_tokens = 0
+            state.user_input = None
+        else:
+            self._release_state(context)
         
-        logger.info(f"Tracked {token_usage.total_tokens} tokens for '{agent.name}'")
+        logger.info(
+            "Tracked %d tokens for '%s' (session: %s, %d messages)",
+            token_usage.total_tokens, agent.name, record.session_id, len(messages),
+        )
     
     async def on_handoff(
         self,
@@ -338,22 +1135,37 @@ class MonkAIRunHooks(RunHooks):
         to_agent: Agent
     ) -> None:
         """Called when agent hands off to another agent"""
-        logger.info(f"Handoff: {from_agent.name} -> {to_agent.name}")
+        logger.info("Handoff: %s -> %s", from_agent.name, to_agent.name)
         
-        timestamp = datetime.utcnow().isoformat()
+        timestamp = _fast_iso(time.time_ns())
         
         # Track the transfer
-        transfer = Transfer(
-            from_agent=from_agent.name,
-            to_agent=to_agent.name,
-            timestamp=timestamp
-        )
-        self._transfers.append(transfer)
+        state = self._state(context)
+        if self.dedupe_transfers:
+            edge = (from_agent.name, to_agent.name)
+            transfer = state.transfer_edges.get(edge)
+            if transfer is not None:
+                transfer.count += 1
+                transfer.timestamp = timestamp
+            else:
+                transfer = state.transfer_edges[edge] = Transfer(
+                    from_agent=from_agent.name,
+                    to_agent=to_agent.name,
+                    timestamp=timestamp,
+                    count=1
+                )
+                state.transfers.append(transfer)
+        else:
+            state.transfers.append(Transfer(
+                from_agent=from_agent.name,
+                to_agent=to_agent.name,
+                timestamp=timestamp
+            ))
         
         # Also create a tool message for the handoff (for frontend visualization)
-        self._messages.append(Message(
+        state.append(Message(
             role="tool",
-            content=f"Transferindo conversa para {to_agent.name}",
+            content=_label("Transferindo conversa para ", to_agent.name),
             sender=from_agent.name,
             tool_name="transfer_to_agent",
             tool_calls=[{
@@ -373,12 +1185,13 @@ class MonkAIRunHooks(RunHooks):
         tool: Tool
     ) -> None:
         """Called when tool execution starts"""
-        logger.debug(f"Tool '{tool.name}' started by {agent.name}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tool '%s' started by %s", tool.name, agent.name)
         
         # Track as a message
-        self._messages.append(Message(
+        self._state(context).append(Message(
             role="tool",
-            content=f"Calling tool: {tool.name}",
+            content=_label("Calling tool: ", tool.name),
             sender=agent.name,
             tool_name=tool.name
         ))
@@ -391,10 +1204,14 @@ class MonkAIRunHooks(RunHooks):
         result: str
     ) -> None:
         """Called when tool execution completes"""
-        logger.debug(f"Tool '{tool.name}' completed")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tool '%s' completed", tool.name)
         
         # Track tool result
-        self._messages.append(Message(
+        state = self._state(context)
+        if self.dedupe_tool_results and isinstance(result, str):
+            result = state.dedupe_tool_result(tool.name, result)
+        state.append(Message(
             role="tool",
             content=result,
             sender=agent.name,
@@ -412,33 +1229,19 @@ class MonkAIRunHooks(RunHooks):
         Called when LLM is about to be called - capture user message.
         This hook provides direct access to input_data which contains the user message.
         """
+        state = self._state(context)
         # The input_data parameter contains the user's message directly!
-        if input_data and not self._user_input:
-            # Convert input_data to string if needed
-            if isinstance(input_data, str):
-                self._user_input = input_data
-            elif isinstance(input_data, list):
-                # If it's a list, find user messages
-                for item in input_data:
-                    if isinstance(item, dict) and item.get('role') == 'user':
-                        self._user_input = item.get('content', str(item))
-                        break
-                    elif hasattr(item, 'role') and getattr(item, 'role') == 'user':
-                        self._user_input = getattr(item, 'content', str(item))
-                        break
-            else:
-                self._user_input = str(input_data)
+        if input_data and not state.user_input:
+            content = _llm_input_user_content(input_data)
+            if content:
+                state.user_input = content
             
             # Add to messages list if not already there
-            if self._user_input:
-                has_user = any(
-                    m.role == 'user' if isinstance(m, Message) else 
-                    m.get('role') == 'user' if isinstance(m, dict) else False 
-                    for m in self._messages
-                )
-                if not has_user:
-                    self._messages.append(Message(role="user", content=self._user_input, sender="user"))
-                    logger.debug(f"Captured user message from on_llm_start: {self._user_input[:50]}...")
+            if state.user_input:
+                if not state.roles_present & _HAS_USER:
+                    state.append(Message(role="user", content=state.user_input, sender="user"))
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Captured user message from on_llm_start: %.50s", state.user_input)
     
     def _capture_internal_tools(self, output: Any, context: RunContextWrapper, agent_name: str) -> None:
         """
@@ -452,35 +1255,24 @@ class MonkAIRunHooks(RunHooks):
         4. new_items array on output (RunResult)
         5. Nested in output.output for streaming results
         """
-        internal_tool_types = {
-            'web_search_call': 'web_search',
-            'file_search_call': 'file_search',
-            'code_interpreter_call': 'code_interpreter',
-            'computer_call': 'computer_use',
-        }
-        
-        raw_items = None
+        state = self._state(context)
         
         # Try to get raw_items from various locations
-        if hasattr(output, 'raw_items') and output.raw_items:
-            raw_items = output.raw_items
-        elif hasattr(output, 'new_items') and output.new_items:
-            raw_items = output.new_items
-        elif hasattr(output, 'items') and output.items:
-            raw_items = output.items
-        elif hasattr(context, 'response') and context.response and hasattr(context.response, 'raw_items') and context.response.raw_items:
-            raw_items = context.response.raw_items
-        elif hasattr(output, 'output') and output.output:
-            nested = output.output
-            if hasattr(nested, 'raw_items') and nested.raw_items:
-                raw_items = nested.raw_items
-            elif hasattr(nested, 'new_items') and nested.new_items:
-                raw_items = nested.new_items
-        elif hasattr(output, '__iter__') and not isinstance(output, str):
-            try:
-                raw_items = list(output)
-            except Exception:
-                pass
+        raw_items = None
+        for attr in _RAW_ITEM_ATTRS:
+            raw_items = getattr(output, attr, None)
+            if raw_items:
+                break
+        else:
+            response = getattr(context, 'response', None)
+            nested = getattr(output, 'output', None)
+            if response and getattr(response, 'raw_items', None):
+                raw_items = response.raw_items
+            elif nested:
+                raw_items = getattr(nested, 'raw_items', None) or getattr(nested, 'new_items', None)
+            elif hasattr(output, '__iter__') and not isinstance(output, str):
+                # Walk unknown iterables lazily instead of materializing them
+                raw_items = _iter_quietly(output)
         
         captured_count = 0
         
@@ -490,73 +1282,60 @@ class MonkAIRunHooks(RunHooks):
                 item_type = getattr(item, 'type', None)
                 
                 # Case 1: Direct internal tool type
-                if item_type in internal_tool_types:
-                    tool_name = internal_tool_types[item_type]
-                    tool_details = self._parse_internal_tool_details(item, item_type)
-                    self._add_internal_tool_message(agent_name, item, item_type, tool_name, tool_details)
-                    captured_count += 1
+                if item_type in _INTERNAL_TOOLS:
+                    captured_count += self._capture_internal_tool(state, agent_name, item, item_type)
                 
                 # Case 2: Wrapped in tool_call_item
                 elif item_type == 'tool_call_item':
                     raw_item = getattr(item, 'raw_item', None)
                     if raw_item:
-                        actual_type = self._get_attr(raw_item, 'type')
-                        if actual_type in internal_tool_types:
-                            tool_name = internal_tool_types[actual_type]
-                            tool_details = self._parse_internal_tool_details(raw_item, actual_type)
-                            self._add_internal_tool_message(agent_name, raw_item, actual_type, tool_name, tool_details)
-                            captured_count += 1
+                        captured_count += self._capture_internal_tool(
+                            state, agent_name, raw_item, _get_field(raw_item, 'type'))
                 
                 # Case 3: Check nested structure
                 else:
-                    for nested_attr in ['raw_item', 'item', 'data', 'content']:
-                        if hasattr(item, nested_attr):
-                            nested = getattr(item, nested_attr)
-                            if nested:
-                                nested_type = self._get_attr(nested, 'type')
-                                if nested_type in internal_tool_types:
-                                    tool_name = internal_tool_types[nested_type]
-                                    tool_details = self._parse_internal_tool_details(nested, nested_type)
-                                    self._add_internal_tool_message(agent_name, nested, nested_type, tool_name, tool_details)
-                                    captured_count += 1
+                    for nested_attr in _NESTED_ITEM_ATTRS:
+                        nested = getattr(item, nested_attr, None)
+                        if nested:
+                            captured_count += self._capture_internal_tool(
+                                state, agent_name, nested, _get_field(nested, 'type'))
         
         # Case 4: Check for web_searches array directly on output
-        if hasattr(output, 'web_searches') and output.web_searches:
-            for ws in output.web_searches:
-                ws_type = self._get_attr(ws, 'type')
-                if ws_type == 'web_search_call':
-                    tool_details = self._parse_internal_tool_details(ws, 'web_search_call')
-                    self._add_internal_tool_message(agent_name, ws, 'web_search_call', 'web_search', tool_details)
-                    captured_count += 1
+        web_searches = getattr(output, 'web_searches', None)
+        if web_searches:
+            for ws in web_searches:
+                if _get_field(ws, 'type') == 'web_search_call':
+                    captured_count += self._capture_internal_tool(state, agent_name, ws, 'web_search_call')
         
         # Case 5: Check output.data for nested data
-        if hasattr(output, 'data') and output.data:
-            data = output.data
-            if hasattr(data, 'raw_items') and data.raw_items:
-                for item in data.raw_items:
-                    item_type = getattr(item, 'type', None)
-                    if item_type in internal_tool_types:
-                        tool_name = internal_tool_types[item_type]
-                        tool_details = self._parse_internal_tool_details(item, item_type)
-                        self._add_internal_tool_message(agent_name, item, item_type, tool_name, tool_details)
-                        captured_count += 1
+        data_items = getattr(getattr(output, 'data', None), 'raw_items', None)
+        if data_items:
+            for item in data_items:
+                item_type = getattr(item, 'type', None)
+                if item_type in _INTERNAL_TOOLS:
+                    captured_count += self._capture_internal_tool(state, agent_name, item, item_type)
         
         if captured_count > 0:
-            logger.info(f"Captured {captured_count} internal tool(s)")
+            logger.info("Captured %d internal tool(s)", captured_count)
+    
+    def _capture_internal_tool(self, state: _SessionState, agent_name: str, item: Any, item_type: Any) -> int:
+        """Record ``item`` if it is an internal tool call. Returns 1 if captured, else 0."""
+        entry = _INTERNAL_TOOLS.get(item_type) if isinstance(item_type, str) else None
+        if entry is None:
+            return 0
+        tool_name, parse_details = entry
+        self._add_internal_tool_message(state, agent_name, item, item_type, tool_name, parse_details(item))
+        return 1
     
     def _get_attr(self, obj: Any, attr: str, default: Any = None) -> Any:
         """Get attribute from object or dict safely"""
-        if obj is None:
-            return default
-        if isinstance(obj, dict):
-            return obj.get(attr, default)
-        return getattr(obj, attr, default)
+        return _get_field(obj, attr, default)
     
-    def _add_internal_tool_message(self, agent_name: str, item: Any, item_type: str, tool_name: str, tool_details: Dict) -> None:
+    def _add_internal_tool_message(self, state: _SessionState, agent_name: str, item: Any, item_type: str, tool_name: str, tool_details: Dict) -> None:
         """Add an internal tool message to the messages list"""
-        self._messages.append(Message(
+        state.append(Message(
             role="tool",
-            content=f"Internal tool: {tool_name}",
+            content=_label("Internal tool: ", tool_name),
             sender=agent_name,
             tool_name=tool_name,
             is_internal_tool=True,
@@ -564,8 +1343,8 @@ class MonkAIRunHooks(RunHooks):
             tool_calls=[{
                 "name": tool_name,
                 "type": item_type,
-                "id": self._get_attr(item, 'id'),
-                "status": self._get_attr(item, 'status'),
+                "id": _get_field(item, 'id'),
+                "status": _get_field(item, 'status'),
                 "arguments": tool_details.get('arguments'),
                 "result": tool_details.get('result'),
             }]
@@ -573,105 +1352,37 @@ class MonkAIRunHooks(RunHooks):
     
     def _serialize_to_dict(self, obj: Any) -> Any:
         """Serialize Pydantic objects or other complex types to JSON-serializable dicts."""
-        if obj is None:
-            return None
-        if isinstance(obj, (str, int, float, bool)):
-            return obj
-        if isinstance(obj, dict):
-            return {k: self._serialize_to_dict(v) for k, v in obj.items()}
-        if isinstance(obj, (list, tuple)):
-            return [self._serialize_to_dict(item) for item in obj]
-        # Pydantic model
-        if hasattr(obj, 'model_dump'):
-            return obj.model_dump()
-        # Dataclass or other object with __dict__
-        if hasattr(obj, '__dict__'):
-            return {k: self._serialize_to_dict(v) for k, v in obj.__dict__.items() if not k.startswith('_')}
-        # Fallback to string
-        return str(obj)
+        return _to_jsonable(obj)
     
     def _parse_internal_tool_details(self, item: Any, item_type: str) -> Dict:
         """Parse specific details for each internal tool type. Supports both objects and dicts."""
-        
-        if item_type == 'web_search_call':
-            action = self._get_attr(item, 'action')
-            result = self._get_attr(item, 'result')
-            
-            # Primary: sources are in action.sources (when include param is used)
-            sources = self._get_attr(action, 'sources') if action else None
-            
-            # Fallback: if sources is None, try result as fallback
-            if sources is None and result:
-                sources = (
-                    self._get_attr(result, 'sources') or 
-                    self._get_attr(result, 'results') or
-                    self._get_attr(result, 'web_results')
-                )
-                if sources is None and isinstance(result, list):
-                    sources = result
-            
-            # Serialize sources to JSON-serializable format
-            serialized_sources = self._serialize_to_dict(sources) if sources else None
-            
-            return {
-                "arguments": {
-                    "query": self._get_attr(action, 'query') if action else None,
-                    "sources": serialized_sources,
-                },
-                "result": self._serialize_to_dict(result)
-            }
-        
-        elif item_type == 'file_search_call':
-            return {
-                "arguments": {
-                    "query": self._get_attr(item, 'query'),
-                    "file_ids": self._get_attr(item, 'file_ids'),
-                },
-                "result": self._get_attr(item, 'results')
-            }
-        
-        elif item_type == 'code_interpreter_call':
-            return {
-                "arguments": {
-                    "code": self._get_attr(item, 'code'),
-                    "language": self._get_attr(item, 'language', 'python'),
-                },
-                "result": self._get_attr(item, 'output')
-            }
-        
-        elif item_type == 'computer_call':
-            action = self._get_attr(item, 'action')
-            return {
-                "arguments": {
-                    "action_type": self._get_attr(action, 'type') if action else None,
-                },
-                "result": self._get_attr(item, 'output')
-            }
-        
-        return {"arguments": None, "result": None}
+        entry = _INTERNAL_TOOLS.get(item_type)
+        if entry is None:
+            return {"arguments": None, "result": None}
+        return entry[1](item)
+    
+    def _session_executor(self) -> ThreadPoolExecutor:
+        """Worker threads for blocking session lookups, created on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="monkai-session")
+        return self._executor
     
     async def _flush_batch(self):
-        """Upload batched records"""
+        """Hand batched records to the shared upload queue"""
         if not self._batch_buffer:
             return
         
-        try:
-            result = self.client.upload_records_batch(self._batch_buffer)
-            logger.info(f"Uploaded {result['total_inserted']} records")
-            self._batch_buffer.clear()
-        except Exception as e:
-            logger.error(f"Upload failed: {e}")
-    
-    def __del__(self):
-        """Flush remaining batch on cleanup"""
-        if self._batch_buffer:
-            import asyncio
-            try:
-                asyncio.create_task(self._flush_batch())
-            except Exception:
-                pass
+        queue = _UploadQueue.instance(self._upload_key)
+        queue.attach(self)
+        for record in self._batch_buffer:
+            queue.put(record)
+        self._batch_buffer.clear()
+        
+        dropped = self._dropped_count + queue.dropped_count
+        if dropped:
+            logger.warning("%d record(s) dropped so far because the upload buffer was full", dropped)
     
-    def _capture_internal_tools_from_result(self, result: Any, agent_name: str) -> None:
+    def _capture_internal_tools_from_result(self, result: Any, agent_name: str, state: Optional[_SessionState] = None) -> None:
         """
         Capture internal tools from the complete RunResult object.
         Called AFTER Runner.run() returns, when we have access to new_items and raw_responses.
@@ -680,20 +1391,15 @@ class MonkAIRunHooks(RunHooks):
         - on_agent_end only receives final_output (a string), not the full RunResult
         - RunResult.new_items contains all ToolCallItem objects with web_search_call, etc.
         """
-        
-        internal_tool_types = {
-            'web_search_call': 'web_search',
-            'file_search_call': 'file_search',
-            'code_interpreter_call': 'code_interpreter',
-            'computer_call': 'computer_use',
-        }
+        if state is None:
+            state = self._state()
         
         captured_count = 0
         
         # Check for new_items (primary source)
         new_items = getattr(result, 'new_items', None)
         if new_items:
-            captured_count += self._process_items_for_internal_tools(new_items, agent_name, 'result.new_items', internal_tool_types)
+            captured_count += self._process_items_for_internal_tools(state, new_items, agent_name, 'result.new_items')
         
         # Also check raw_responses as backup
         raw_responses = getattr(result, 'raw_responses', None)
@@ -701,42 +1407,34 @@ class MonkAIRunHooks(RunHooks):
             for i, resp in enumerate(raw_responses):
                 resp_output = getattr(resp, 'output', None)
                 if resp_output and isinstance(resp_output, list):
-                    captured_count += self._process_items_for_internal_tools(resp_output, agent_name, f'result.raw_responses[{i}].output', internal_tool_types)
+                    captured_count += self._process_items_for_internal_tools(state, resp_output, agent_name, f'result.raw_responses[{i}].output')
         
         if captured_count > 0:
-            # Add internal tools to the LAST buffered record (the one from on_agent_end)
-            if self._batch_buffer:
-                last_record = self._batch_buffer[-1]
-                internal_tool_messages = [m for m in self._messages if getattr(m, 'is_internal_tool', False)]
+            # Add internal tools to this user's record from on_agent_end
+            last_record = state.last_record
+            if last_record is not None:
+                internal_tool_messages = [m for m in state.messages if getattr(m, 'is_internal_tool', False)]
                 if internal_tool_messages:
                     existing_msgs = last_record.msg if isinstance(last_record.msg, list) else []
                     last_record.msg = existing_msgs + internal_tool_messages
     
-    def _process_items_for_internal_tools(self, items: list, agent_name: str, source: str, internal_tool_types: dict) -> int:
+    def _process_items_for_internal_tools(self, state: _SessionState, items: list, agent_name: str, source: str) -> int:
         """Process a list of items to extract internal tools. Returns count of captured tools."""
         captured_count = 0
         
         for item in items:
-            item_type = self._get_attr(item, 'type')
+            item_type = _get_field(item, 'type')
             
             # Case 1: Direct internal tool (item.type == 'web_search_call')
-            if item_type in internal_tool_types:
-                tool_name = internal_tool_types[item_type]
-                tool_details = self._parse_internal_tool_details(item, item_type)
-                self._add_internal_tool_message(agent_name, item, item_type, tool_name, tool_details)
-                captured_count += 1
-                continue
+            if item_type in _INTERNAL_TOOLS:
+                captured_count += self._capture_internal_tool(state, agent_name, item, item_type)
             
             # Case 2: Wrapped in ToolCallItem (item.type == 'tool_call_item')
-            if item_type == 'tool_call_item':
-                raw_item = self._get_attr(item, 'raw_item')
+            elif item_type == 'tool_call_item':
+                raw_item = _get_field(item, 'raw_item')
                 if raw_item:
-                    actual_type = self._get_attr(raw_item, 'type')
-                    if actual_type in internal_tool_types:
-                        tool_name = internal_tool_types[actual_type]
-                        tool_details = self._parse_internal_tool_details(raw_item, actual_type)
-                        self._add_internal_tool_message(agent_name, raw_item, actual_type, tool_name, tool_details)
-                        captured_count += 1
+                    captured_count += self._capture_internal_tool(
+                        state, agent_name, raw_item, _get_field(raw_item, 'type'))
         
         return captured_count
     
@@ -758,10 +1456,12 @@ class MonkAIRunHooks(RunHooks):
             result = await MonkAIRunHooks.run_with_tracking(agent, "Hello", hooks)
         """
         # Set user input before running
-        hooks.set_user_input(user_input)
+        user_key = hooks._user_key()
+        state = hooks._state()
+        state.pending_user_input = user_input
         
         # Skip auto-flush in on_agent_end - we'll flush after capturing internal tools
-        hooks._skip_auto_flush = True
+        state.skip_auto_flush = True
         
         # Import Runner and RunConfig here to avoid circular dependency
         from agents import Runner
@@ -804,7 +1504,7 @@ class MonkAIRunHooks(RunHooks):
             
             # Capture internal tools BEFORE flush (while buffer still has records)
             if result:
-                hooks._capture_internal_tools_from_result(result, agent.name)
+                hooks._capture_internal_tools_from_result(result, agent.name, state)
             
         except ImportError:
             # Fallback for older agents SDK versions without RunConfig/ModelSettings
@@ -813,22 +1513,24 @@ class MonkAIRunHooks(RunHooks):
             
             # Capture internal tools in fallback path too
             if result:
-                hooks._capture_internal_tools_from_result(result, agent.name)
+                hooks._capture_internal_tools_from_result(result, agent.name, state)
         
         except Exception as e:
-            logger.error(f"Error in run_with_tracking: {e}")
+            logger.error("Error in run_with_tracking: %s", e)
             raise
         
         finally:
-            # Reset skip flag
-            hooks._skip_auto_flush = False
+            # Done with this user's conversation state
+            state.skip_auto_flush = False
+            if hooks._sessions.get(user_key) is state:
+                del hooks._sessions[user_key]
             
             # ALWAYS flush records AFTER capturing internal tools
             if hooks._batch_buffer:
                 try:
                     await hooks._flush_batch()
                 except Exception as flush_error:
-                    logger.error(f"Flush error: {flush_error}")
+                    logger.error("Flush error: %s", flush_error)
         
         return result
     
@@ -842,3 +1544,46 @@ class MonkAIRunHooks(RunHooks):
             await hooks.flush()  # Ensure records are uploaded
         """
         await self._flush_batch()
+        queue = _UploadQueue.lookup(self._upload_key)
+        if queue is None and self._upload_key in _UploadQueue._orphans:
+            # Picks up records left behind by a previous event loop
+            queue = _UploadQueue.instance(self._upload_key)
+            queue.attach(self)
+        if queue is not None:
+            await queue.join()
+    
+    async def aclose(self) -> None:
+        """
+        Flush buffered records and release the session lookup threads.
+        
+        The pooled HTTP session belongs to the upload queue shared by every
+        hooks instance with this tracer token; it is closed once the last of
+        them has been closed.
+        
+        Usage:
+            hooks = MonkAIRunHooks(...)
+            try:
+                result = await Runner.run(agent, input, hooks=hooks)
+            finally:
+                await hooks.aclose()
+        
+        or, equivalently:
+            async with MonkAIRunHooks(...) as hooks:
+                result = await Runner.run(agent, input, hooks=hooks)
+        """
+        await self.flush()
+        # The upload client belongs to the shared queue, which closes it once
+        # no other hooks instance is using it
+        queue = _UploadQueue.lookup(self._upload_key)
+        if queue is not None:
+            await queue.release(self)
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # Wait for in-flight lookups without blocking the loop
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+    
+    async def __aenter__(self) -> "MonkAIRunHooks":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -1,6 +1,6 @@
 """Pydantic models for MonkAI data structures"""
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
@@ -35,6 +35,7 @@ class Transfer(BaseModel):
     to_agent: str = Field(..., alias="to")
     reason: Optional[str] = None
     timestamp: Optional[str] = None
+    count: Optional[int] = Field(None, description="Handoffs folded into this entry, when repeats are deduplicated")
 
     class Config:
         populate_by_name = True
@@ -178,8 +179,31 @@ class ConversationRecord(BaseModel):
         description="LLM model used (e.g., gpt-4o, claude-sonnet-4-6-20250514, gpt-4.1-mini)"
     )
 
+    # Memoized to_api_format() payload; dropped whenever a field is reassigned
+    _api_format: Optional[Dict] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._api_format = None
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "ConversationRecord":
+        copy = super().model_copy(update=update, deep=deep)
+        copy._api_format = None
+        return copy
+
     def to_api_format(self) -> Dict:
-        """Convert to API request format"""
+        """Convert to API request format
+
+        The payload is built once and cached on the record; each call returns
+        a shallow copy. Reassigning a field rebuilds it, but in-place edits of
+        nested messages (e.g. ``record.msg[0].content = ...``) are not tracked.
+        """
+        if self._api_format is None:
+            self._api_format = self._build_api_format()
+        return dict(self._api_format)
+
+    def _build_api_format(self) -> Dict:
         data = {
             "namespace": self.namespace,
             "agent": self.agent,
@@ -195,7 +219,10 @@ class ConversationRecord(BaseModel):
         data["process_tokens"] = self.process_tokens or 0
         data["memory_tokens"] = self.memory_tokens or 0
         if self.transfers:
-            data["transfers"] = [t.model_dump(by_alias=True) for t in self.transfers]
+            data["transfers"] = [
+                t.model_dump(by_alias=True, exclude=None if t.count else {"count"})
+                for t in self.transfers
+            ]
         if self.inserted_at:
             data["inserted_at"] = self.inserted_at
         if self.user_id:
@@ -1,14 +1,28 @@
 """Session management with timeout support"""
 
 import time
+import heapq
 import logging
-from typing import Optional, Dict
+from itertools import count
+from typing import Optional, Dict, List, Tuple
 from threading import Lock, Thread, Event
-from datetime import datetime, timedelta
+
+from ._clock import session_stamp
 
 logger = logging.getLogger(__name__)
 
 
+class _Session:
+    """Active session of one user; times are readings of the manager's clock"""
+    
+    __slots__ = ("session_id", "last_activity", "created_at")
+    
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.last_activity = now
+        self.created_at = now
+
+
 class SessionManager:
     """
     Gerencia sessões com timeout de inatividade.
@@ -27,9 +41,16 @@ class SessionManager:
             auto_cleanup_interval: Intervalo em segundos para limpeza automática (0 = desabilitado)
         """
         self.inactivity_timeout = inactivity_timeout
-        self._sessions: Dict[str, Dict] = {}
+        self._sessions: Dict[str, _Session] = {}
+        # (last activity when pushed, tiebreak, user_id, session), oldest first.
+        # Entries go stale when a session is touched or replaced; cleanup
+        # re-checks them instead of updating the heap on every touch.
+        self._expiry_heap: List[Tuple[float, int, str, _Session]] = []
+        self._expiry_seq = count()
         self._lock = Lock()
         self._shutdown_event = Event()
+        # Clock for activity times; tests swap it for a fake one instead of sleeping
+        self._now = time.monotonic
         
         if auto_cleanup_interval > 0:
             self._cleanup_thread = Thread(
@@ -44,7 +65,7 @@ class SessionManager:
         while not self._shutdown_event.wait(timeout=interval):
             removed = self.cleanup_expired()
             if removed > 0:
-                logger.debug(f"Auto-cleanup removed {removed} expired sessions")
+                logger.debug("Auto-cleanup removed %d expired sessions", removed)
     
     def shutdown(self) -> None:
         """Signal the cleanup thread to stop."""
@@ -65,38 +86,66 @@ class SessionManager:
         Returns:
             session_id no formato: {namespace}-{user_id}-{timestamp_inicio}
         """
+        if not force_new:
+            session_id = self._touch_active(user_id)
+            if session_id is not None:
+                return session_id
+        
         with self._lock:
-            current_time = time.time()
+            current_time = self._now()
             
             if user_id in self._sessions and not force_new:
                 session_data = self._sessions[user_id]
-                time_since_last = current_time - session_data['last_activity']
+                time_since_last = current_time - session_data.last_activity
                 
-                # Sessão ainda ativa?
+                # Sessão ainda ativa? (another thread may have just created it)
                 if time_since_last < self.inactivity_timeout:
                     # Atualizar last_activity
-                    session_data['last_activity'] = current_time
-                    return session_data['session_id']
+                    session_data.last_activity = current_time
+                    return session_data.session_id
                 else:
                     # Sessão expirou
-                    logger.info(f"Session expired for {user_id} (inactive for {int(time_since_last)}s)")
+                    logger.info("Session expired for %s (inactive for %ds)", user_id, time_since_last)
             
-            timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            timestamp = session_stamp(time.time_ns())
             session_id = f"{namespace}-{user_id}-{timestamp}"
             
-            self._sessions[user_id] = {
-                'session_id': session_id,
-                'last_activity': current_time,
-                'created_at': current_time
-            }
+            self._store(user_id, _Session(session_id, current_time))
             
             return session_id
     
+    def _store(self, user_id: str, session: _Session) -> None:
+        """Register a new session for ``user_id``; call with ``self._lock`` held"""
+        self._sessions[user_id] = session
+        heapq.heappush(
+            self._expiry_heap,
+            (session.last_activity, next(self._expiry_seq), user_id, session),
+        )
+    
+    def _touch_active(self, user_id: str) -> Optional[str]:
+        """
+        Lock-free fast path: refresh and return the user's session if it is
+        still active, else None.
+        
+        A dict lookup and a single attribute store on the session record are
+        atomic (under the GIL, and per-object locked on free-threaded builds),
+        so the common cache hit needs no lock. Creating, expiring and removing
+        sessions still happen under ``self._lock``.
+        """
+        data = self._sessions.get(user_id)
+        if data is None:
+            return None
+        current_time = self._now()
+        if current_time - data.last_activity >= self.inactivity_timeout:
+            return None
+        data.last_activity = current_time
+        return data.session_id
+    
     def update_activity(self, user_id: str) -> None:
         """Atualiza timestamp de última atividade"""
-        with self._lock:
-            if user_id in self._sessions:
-                self._sessions[user_id]['last_activity'] = time.time()
+        data = self._sessions.get(user_id)
+        if data is not None:
+            data.last_activity = self._now()
     
     def close_session(self, user_id: str) -> None:
         """Força fechamento de sessão"""
@@ -107,17 +156,27 @@ class SessionManager:
     def cleanup_expired(self) -> int:
         """Remove sessões expiradas. Retorna número de sessões removidas."""
         with self._lock:
-            current_time = time.time()
-            expired = []
-            
-            for user_id, data in self._sessions.items():
-                if current_time - data['last_activity'] > self.inactivity_timeout:
-                    expired.append(user_id)
+            current_time = self._now()
+            heap = self._expiry_heap
+            removed = 0
             
-            for user_id in expired:
-                del self._sessions[user_id]
+            # Only sessions idle past the timeout as of their last push are
+            # looked at, rather than scanning every session
+            while heap and current_time - heap[0][0] > self.inactivity_timeout:
+                _, _, user_id, session = heapq.heappop(heap)
+                if self._sessions.get(user_id) is not session:
+                    continue  # closed or replaced since
+                if current_time - session.last_activity > self.inactivity_timeout:
+                    del self._sessions[user_id]
+                    removed += 1
+                else:
+                    # Touched since it was pushed: requeue at its current activity
+                    heapq.heappush(
+                        heap,
+                        (session.last_activity, next(self._expiry_seq), user_id, session),
+                    )
             
-            return len(expired)
+            return removed
     
     def get_session_info(self, user_id: str) -> Optional[Dict]:
         """Retorna informações da sessão ativa"""
@@ -125,9 +184,9 @@ class SessionManager:
             if user_id in self._sessions:
                 data = self._sessions[user_id]
                 return {
-                    'session_id': data['session_id'],
-                    'duration': time.time() - data['created_at'],
-                    'inactive_for': time.time() - data['last_activity']
+                    'session_id': data.session_id,
+                    'duration': self._now() - data.created_at,
+                    'inactive_for': self._now() - data.last_activity
                 }
             return None
 
@@ -182,13 +241,11 @@ class PersistentSessionManager(SessionManager):
         Returns:
             session_id no formato: {namespace}-{user_id}-{timestamp}
         """
-        # Step 1: Check local cache first (fast path)
-        with self._lock:
-            if user_id in self._sessions and not force_new:
-                data = self._sessions[user_id]
-                if time.time() - data['last_activity'] < self.inactivity_timeout:
-                    data['last_activity'] = time.time()
-                    return data['session_id']
+        # Step 1: Check local cache first (fast path, no lock)
+        if not force_new:
+            session_id = self._touch_active(user_id)
+            if session_id is not None:
+                return session_id
         
         # Step 2: Query backend for persistent session
         try:
@@ -203,16 +260,12 @@ class PersistentSessionManager(SessionManager):
             
             # Update local cache
             with self._lock:
-                self._sessions[user_id] = {
-                    'session_id': session_id,
-                    'last_activity': time.time(),
-                    'created_at': time.time()
-                }
+                self._store(user_id, _Session(session_id, self._now()))
             
             action = "Reused" if reused else "Created"
-            logger.info(f"PersistentSessionManager {action} session: {session_id}")
+            logger.info("PersistentSessionManager %s session: %s", action, session_id)
             return session_id
             
         except Exception as e:
-            logger.warning(f"PersistentSessionManager server lookup failed, using local fallback: {e}")
+            logger.warning("PersistentSessionManager server lookup failed, using local fallback: %s", e)
             return super().get_or_create_session(user_id, namespace, force_new)
@@ -1,6 +1,7 @@
 """Pytest configuration and fixtures"""
 
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, AsyncMock
 from monkai_trace import MonkAIClient
 from monkai_trace.models import ConversationRecord, Message, TokenUsage
@@ -55,6 +56,23 @@ def mock_agent():
     return agent
 
 
+@pytest.fixture
+def make_context():
+    """Factory for plain run contexts: ``make_context(input="Hi", user_id="u1")``"""
+    def make(**attrs):
+        context = SimpleNamespace(
+            input="Test input",
+            messages=None,
+            user_id=None,
+            response=None,
+            context=None,
+            usage=SimpleNamespace(input_tokens=10, output_tokens=20, total_tokens=30, requests=1),
+        )
+        context.__dict__.update(attrs)
+        return context
+    return make
+
+
 @pytest.fixture
 def mock_context():
     """Mock RunContextWrapper with proper attributes"""
@@ -83,6 +101,33 @@ def mock_context():
     return context
 
 
+@pytest.fixture
+def mock_output():
+    """Factory for agent outputs: ``mock_output("Output 1")``"""
+    def make(final_output: str = "Test output"):
+        # Plain attributes only, so no item lists or __iter__ are probed
+        return SimpleNamespace(
+            final_output=final_output, raw_items=None, new_items=None, items=None, output=None
+        )
+    return make
+
+
+@pytest.fixture
+def fake_clock():
+    """Monotonic-style clock for session timeouts; ``fake_clock.advance(2)`` instead of sleeping"""
+    class FakeClock:
+        def __init__(self):
+            self.now = 1000.0
+        
+        def __call__(self) -> float:
+            return self.now
+        
+        def advance(self, seconds: float) -> None:
+            self.now += seconds
+    
+    return FakeClock()
+
+
 # E2E test fixtures
 @pytest.fixture
 def monkai_credentials():
@@ -1,5 +1,6 @@
 """Verify the async SDK client surfaces server-side dedup drops."""
 
+import json
 import logging
 from unittest.mock import patch, MagicMock, AsyncMock
 import pytest
@@ -16,7 +17,6 @@ def _fake_aiohttp_response(json_payload, status=201):
     return resp
 
 
-@pytest.mark.asyncio
 async def test_clean_insert_no_warning_no_raise(caplog):
     client = AsyncMonkAIClient(tracer_token="tk_test", strict_dedup=True)
 
@@ -33,7 +33,6 @@ async def test_clean_insert_no_warning_no_raise(caplog):
     assert "dropped" not in caplog.text.lower()
 
 
-@pytest.mark.asyncio
 async def test_all_dup_emits_warning(caplog):
     client = AsyncMonkAIClient(tracer_token="tk_test")
 
@@ -49,7 +48,6 @@ async def test_all_dup_emits_warning(caplog):
     assert "dropped 1/1" in caplog.text.lower()
 
 
-@pytest.mark.asyncio
 async def test_strict_mode_raises_on_drop():
     client = AsyncMonkAIClient(tracer_token="tk_test", strict_dedup=True)
 
@@ -67,7 +65,6 @@ async def test_strict_mode_raises_on_drop():
     assert err.total_received == 1
 
 
-@pytest.mark.asyncio
 async def test_strict_mode_no_raise_on_clean():
     client = AsyncMonkAIClient(tracer_token="tk_test", strict_dedup=True)
 
@@ -78,3 +75,19 @@ async def test_strict_mode_no_raise_on_clean():
                 namespace="t", agent="a",
                 messages=[{"role": "user", "content": "hi"}],
             )
+
+
+async def test_request_body_is_encoded_json_bytes():
+    client = AsyncMonkAIClient(tracer_token="tk_test")
+
+    fake = _fake_aiohttp_response({"inserted_count": 1})
+    with patch("aiohttp.ClientSession.request", return_value=fake) as request:
+        async with client:
+            await client.upload_record(
+                namespace="t", agent="a",
+                messages=[{"role": "user", "content": "olá"}],
+            )
+
+    body = request.call_args.kwargs["data"]
+    assert isinstance(body, bytes)
+    assert json.loads(body)["records"][0]["namespace"] == "t"
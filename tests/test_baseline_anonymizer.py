@@ -300,3 +300,19 @@ def test_apply_to_messages_content_none_emits_no_warning(caplog):
         out = a.apply_to_messages([{"role": "tool", "content": None}])
     assert out == [{"role": "tool", "content": None}]
     assert "PII may be transmitted unredacted" not in caplog.text
+
+
+def test_repeated_text_is_redacted_once_per_disabled_set():
+    a = BaselineAnonymizer()
+    text = "contato: user@example.com"
+    assert a.apply(text) == "contato: [EMAIL]"
+    assert a.apply(text) == "contato: [EMAIL]"
+    assert a.apply(text, disabled_classes=["EMAIL"]) == text
+    info = a._cached_redact.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_cache_can_be_disabled():
+    a = BaselineAnonymizer(cache_size=0)
+    assert a._cached_redact is None
+    assert a.apply("user@example.com") == "[EMAIL]"
@@ -1,5 +1,6 @@
 """Tests for MonkAIClient"""
 
+import json
 import pytest
 from unittest.mock import Mock, patch, mock_open
 from monkai_trace import MonkAIClient
@@ -14,6 +15,13 @@ def test_client_initialization():
     assert client.base_url == MonkAIClient.BASE_URL
 
 
+def test_client_state_lives_in_slots():
+    """Instance attributes are slotted, so the fallback __dict__ stays empty"""
+    client = MonkAIClient(tracer_token="tk_test")
+    
+    assert client.__dict__ == {}
+
+
 def test_client_custom_base_url():
     """Test client with custom base URL"""
     client = MonkAIClient(
@@ -96,6 +104,10 @@ def test_upload_log_success(mock_request):
     )
     
     assert result["success"] == True
+    
+    body = mock_request.call_args.kwargs["data"]
+    assert isinstance(body, bytes)
+    assert json.loads(body)["logs"][0]["message"] == "Test log message"
 
 
 @patch('builtins.open', new_callable=mock_open, read_data='[{"namespace": "test", "agent": "test-agent", "msg": {"role": "user", "content": "Hi"}}]')
@@ -132,3 +144,206 @@ def test_test_connection_failure(mock_request):
     
     client = MonkAIClient(tracer_token="tk_test")
     assert client.test_connection() == False
+
+
+@patch('requests.Session.request')
+def test_export_records_csv_streams_to_file(mock_request, tmp_path):
+    """CSV exports are streamed to disk as raw bytes"""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.encoding = "utf-8"
+    mock_response.iter_content.return_value = iter(["a,b\n".encode(), "ção,2\n".encode()])
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    out = tmp_path / "records.csv"
+    content = client.export_records(namespace="test", format="csv", output_file=str(out))
+    
+    assert content == "a,b\nção,2\n"
+    assert out.read_bytes() == "a,b\nção,2\n".encode()
+    assert mock_request.call_args.kwargs["stream"] is True
+
+
+@patch('requests.Session.request')
+def test_export_logs_json_writes_file(mock_request, tmp_path):
+    """JSON exports are parsed from the raw body and written indented"""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.content = json.dumps({"logs": [{"message": "olá"}]}).encode()
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    out = tmp_path / "logs.json"
+    logs = client.export_logs(namespace="test", output_file=str(out))
+    
+    assert logs == [{"message": "olá"}]
+    assert json.loads(out.read_text(encoding="utf-8")) == logs
+
+
+@patch('requests.Session.request')
+def test_upload_logs_batch_concurrent_chunks_keep_failure_index(mock_request):
+    """Chunks upload concurrently; failures still report their chunk index"""
+    def fake(method, url, data=None, **kwargs):
+        if json.loads(data)["logs"][0]["message"] == "2":
+            raise ConnectionError("boom")
+        response = Mock()
+        response.status_code = 201
+        response.json.return_value = {"inserted_count": 1}
+        return response
+    mock_request.side_effect = fake
+    
+    client = MonkAIClient(tracer_token="tk_test", max_retries=1)
+    logs = [LogEntry(namespace="test", level="info", message=str(i)) for i in range(5)]
+    result = client.upload_logs_batch(logs, chunk_size=1, max_concurrency=3)
+    
+    assert mock_request.call_count == 5
+    assert result["total_inserted"] == 4
+    assert [f["chunk_index"] for f in result["failures"]] == [2]
+
+
+@patch('requests.Session.request')
+def test_compress_uploads_gzips_large_bodies(mock_request):
+    """Large upload bodies are gzipped when compress_uploads is enabled"""
+    import gzip
+    mock_response = Mock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {"inserted_count": 1}
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test", compress_uploads=True)
+    client.upload_log(namespace="test", level="info", message="x" * 4096)
+    
+    kwargs = mock_request.call_args.kwargs
+    assert kwargs["headers"] == {"Content-Encoding": "gzip"}
+    assert json.loads(gzip.decompress(kwargs["data"]))["logs"][0]["message"] == "x" * 4096
+    
+    client.upload_log(namespace="test", level="info", message="short")
+    assert mock_request.call_args.kwargs["headers"] is None
+
+
+@patch('monkai_trace.client.time.sleep')
+@patch('requests.Session.request')
+def test_rate_limited_upload_is_retried_after_retry_after(mock_request, mock_sleep):
+    """429 responses are retried, waiting as long as Retry-After asks"""
+    limited = Mock()
+    limited.status_code = 429
+    limited.headers = {"Retry-After": "0.5"}
+    ok = Mock()
+    ok.status_code = 201
+    ok.json.return_value = {"inserted_count": 1}
+    mock_request.side_effect = [limited, ok]
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    result = client.upload_log(namespace="test", level="info", message="hi")
+    
+    assert result == {"inserted_count": 1}
+    assert mock_request.call_count == 2
+    mock_sleep.assert_called_once_with(0.5)
+    limited.close.assert_called_once_with()
+
+
+@patch('requests.Session.request')
+def test_upload_records_from_json_streams_chunks(mock_request, tmp_path):
+    """Records are read from the file incrementally and uploaded chunk by chunk"""
+    mock_response = Mock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {"inserted_count": 2}
+    mock_request.return_value = mock_response
+    
+    records = [
+        {"namespace": "test", "agent": "bot", "msg": {"role": "user", "content": f"Hi {i}"}}
+        for i in range(5)
+    ]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps({"exported_at": "2025-01-01", "records": records}), encoding="utf-8")
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    result = client.upload_records_from_json(path, chunk_size=2, max_concurrency=2)
+    
+    assert mock_request.call_count == 3
+    assert result["total_records"] == 5
+    assert result["total_inserted"] == 6
+
+
+@patch('requests.Session.request')
+def test_upload_records_from_json_reports_malformed_file(mock_request, tmp_path):
+    """A file that breaks off part way returns the parse error with the counts so far"""
+    mock_response = Mock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {"inserted_count": 2}
+    mock_request.return_value = mock_response
+    
+    records = [
+        {"namespace": "test", "agent": "bot", "msg": {"role": "user", "content": f"Hi {i}"}}
+        for i in range(3)
+    ]
+    path = tmp_path / "records.json"
+    body = ", ".join(json.dumps(record) for record in records)
+    path.write_text('{"records": [' + body + ' 7]}', encoding="utf-8")
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    result = client.upload_records_from_json(path, chunk_size=2, max_concurrency=2)
+    
+    assert result["total_records"] == 3
+    assert result["total_inserted"] == 4
+    assert result["failures"] == []
+    assert "Expected ','" in result["parse_error"]
+
+
+@patch('requests.Session.request')
+def test_enqueue_record_batches_until_threshold(mock_request, sample_conversation_record):
+    """Enqueued records are sent together once the threshold is reached"""
+    mock_response = Mock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {"inserted_count": 3}
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test", flush_threshold=3, flush_interval=60)
+    client.enqueue_record(sample_conversation_record)
+    client.enqueue_record(sample_conversation_record)
+    assert mock_request.call_count == 0
+    
+    client.enqueue_record(sample_conversation_record)
+    assert mock_request.call_count == 1
+    assert len(json.loads(mock_request.call_args.kwargs["data"])["records"]) == 3
+    
+    client.enqueue_record(sample_conversation_record)
+    client.close()
+    assert mock_request.call_count == 2
+    assert len(json.loads(mock_request.call_args.kwargs["data"])["records"]) == 1
+
+
+@patch('requests.Session.request')
+def test_enqueue_record_flushes_after_interval(mock_request, sample_conversation_record):
+    """A partial buffer is sent once flush_interval elapses"""
+    import time
+    mock_response = Mock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {"inserted_count": 1}
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test", flush_threshold=10, flush_interval=0.05)
+    client.enqueue_record(sample_conversation_record)
+    deadline = time.monotonic() + 2
+    while mock_request.call_count == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert mock_request.call_count == 1
+
+
+@patch('requests.Session.request')
+def test_export_logs_csv_without_content_returns_path(mock_request, tmp_path):
+    """return_content=False streams the CSV to disk and returns the file path"""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.iter_content.return_value = iter([b"level,message\n", b"info,hi\n"])
+    mock_request.return_value = mock_response
+    
+    client = MonkAIClient(tracer_token="tk_test")
+    out = tmp_path / "logs.csv"
+    result = client.export_logs(
+        namespace="test", format="csv", output_file=str(out), return_content=False
+    )
+    
+    assert result == str(out)
+    assert out.read_bytes() == b"level,message\ninfo,hi\n"
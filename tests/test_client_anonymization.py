@@ -1,6 +1,7 @@
 """Verify the SDK applies BaselineAnonymizer before transmission."""
 
 import json
+from json import loads as _json_loads
 from unittest.mock import patch, MagicMock
 from monkai_trace import MonkAIClient
 
@@ -9,7 +10,9 @@ def test_upload_record_anonymizes_message_content_before_send():
     client = MonkAIClient(tracer_token="tk_test")
     captured_payload = {}
 
-    def fake_request(method, url, json=None, **kwargs):
+    def fake_request(method, url, json=None, data=None, **kwargs):
+        if data is not None:
+            json = _json_loads(data)
         if json is not None:
             captured_payload.update(json)
         resp = MagicMock()
@@ -44,7 +47,9 @@ def test_upload_record_anonymizes_tool_use_blocks_before_send():
     client = MonkAIClient(tracer_token="tk_test")
     captured_payload = {}
 
-    def fake_request(method, url, json=None, **kwargs):
+    def fake_request(method, url, json=None, data=None, **kwargs):
+        if data is not None:
+            json = _json_loads(data)
         if json is not None:
             captured_payload.update(json)
         resp = MagicMock()
@@ -12,6 +12,7 @@ exercising:
 
 import asyncio
 import json
+from json import loads as _json_loads
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -35,7 +36,9 @@ def _seed_rules(client, version, toggles=None, custom=None):
 
 
 def _capture_post(captured):
-    def fake(method, url, json=None, **kwargs):
+    def fake(method, url, json=None, data=None, **kwargs):
+        if data is not None:
+            json = _json_loads(data)
         if json is not None:
             captured.append(json)
         resp = MagicMock()
@@ -161,10 +164,12 @@ def _async_capture_request():
             if self.status >= 400:
                 raise RuntimeError(f"http {self.status}")
 
-        async def json(self):
+        async def json(self, loads=None):
             return self._payload
 
-    def fake_request(method, url, json=None, **kwargs):
+    def fake_request(method, url, json=None, data=None, **kwargs):
+        if data is not None:
+            json = _json_loads(data)
         if json is not None:
             captured.append(json)
         return _Resp()
@@ -0,0 +1,96 @@
+"""Tests for incremental JSON file parsing"""
+
+import json
+
+import pytest
+from monkai_trace import file_handlers
+from monkai_trace.file_handlers import FileHandler, _iter_json_array
+
+
+@pytest.fixture(autouse=True)
+def tiny_reads(monkeypatch):
+    """Read a few characters at a time so values straddle block edges"""
+    monkeypatch.setattr(file_handlers, "_READ_SIZE", 4)
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    def write(text):
+        path = tmp_path / "data.json"
+        path.write_text(text, encoding="utf-8")
+        return path
+    return write
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # values spanning many blocks
+        ('{"records": [{"content": "a fairly long message"}, {"ids": [1, 2, 3]}]}',
+         [{"content": "a fairly long message"}, {"ids": [1, 2, 3]}]),
+        # numbers cut at a block edge
+        ('{"records": [123456789, 2.5e10, -7, 1234]}', [123456789, 2.5e10, -7, 1234]),
+        ('[1234567]', [1234567]),
+        # sibling keys before the target key
+        ('{"exported_at": "2025-01-01", "meta": {"records": [0], "n": [1, {"x": "]"}]}, "records": [1]}',
+         [1]),
+        # strings containing array/object delimiters
+        ('{"records": ["a]b", "c,d", "e}f", {"k": "]},"}]}', ["a]b", "c,d", "e}f", {"k": "]},"}]),
+        # empty arrays and the top-level array form
+        ('{"records": []}', []),
+        ('{"records": [ \n ]}', []),
+        ('[]', []),
+        ('  [ {"a": 1} ,\n 2 ]  ', [{"a": 1}, 2]),
+    ],
+)
+def test_iter_json_array(json_file, text, expected):
+    assert list(_iter_json_array(json_file(text), "records")) == expected
+
+
+@pytest.mark.parametrize("offset", range(8))
+def test_iter_json_array_numbers_cut_at_every_position(json_file, offset):
+    """Each offset moves the block edges to a different character of the numbers"""
+    text = " " * offset + "[2.5e10, -7.25E+3, 100, 0.5]"
+
+    assert list(_iter_json_array(json_file(text), "records")) == [2.5e10, -7.25e3, 100, 0.5]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('{"logs": [1]}', "must contain 'records' key"),
+        ('{}', "must contain 'records' key"),
+        ('"records"', "must contain 'records' key"),
+        ('{"records": {"a": 1}}', r"Expected '\['"),
+        ('{"records": 5}', r"Expected '\['"),
+        ('[1 2]', "Expected ','"),
+        ('{"records": [1, 2', "Expected ','"),
+        ('[1, {"a": ', "Expecting value"),
+        ('{"records": ["unterminated', "Unterminated string"),
+        ('', "must contain 'records' key"),
+    ],
+)
+def test_iter_json_array_rejects_malformed_input(json_file, text, message):
+    with pytest.raises(ValueError, match=message):
+        list(_iter_json_array(json_file(text), "records"))
+
+
+def test_iter_json_array_yields_items_before_an_error(json_file):
+    items = _iter_json_array(json_file('[1, 2 3]'), "records")
+
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_iter_records_from_json_skips_invalid_records(json_file):
+    records = [
+        {"namespace": "test", "agent": "bot", "msg": {"role": "user", "content": "Hi"}},
+        {"namespace": "test"},
+    ]
+    path = json_file(json.dumps({"records": records}))
+
+    loaded = list(FileHandler.iter_records_from_json(path))
+
+    assert [r.agent for r in loaded] == ["bot"]
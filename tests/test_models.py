@@ -34,6 +34,22 @@ def test_transfer_creation():
     assert transfer.reason == "User requested specialist help"
 
 
+def test_transfer_count_only_sent_when_set():
+    """Test transfers omit count unless repeated handoffs were folded into them"""
+    record = ConversationRecord(
+        namespace="test",
+        agent="agent-a",
+        msg=[Message(role="user", content="hi")],
+        transfers=[
+            Transfer(from_agent="agent-a", to_agent="agent-b"),
+            Transfer(from_agent="agent-b", to_agent="agent-a", count=3),
+        ]
+    )
+    plain, folded = record.to_api_format()["transfers"]
+    assert "count" not in plain
+    assert folded["count"] == 3
+
+
 def test_token_usage_from_openai_agents(sample_token_usage):
     """Test TokenUsage.from_openai_agents_usage"""
     token_usage = TokenUsage.from_openai_agents_usage(
@@ -131,3 +147,21 @@ def test_log_entry_creation():
     assert log.namespace == "test"
     assert log.level == "info"
     assert log.message == "Test log message"
+
+
+def test_conversation_record_api_format_is_cached_until_field_changes():
+    """to_api_format() is memoized and rebuilt after a field is reassigned"""
+    record = ConversationRecord(
+        namespace="test",
+        agent="bot",
+        msg=Message(role="user", content="Hello"),
+    )
+    first = record.to_api_format()
+    first["anonymization_version"] = 3  # callers may add keys to their copy
+    second = record.to_api_format()
+    assert "anonymization_version" not in second
+    assert second["msg"] is first["msg"]
+
+    record.agent = "other-bot"
+    assert record.to_api_format()["agent"] == "other-bot"
+    assert record.model_copy(update={"agent": "copy"}).to_api_format()["agent"] == "copy"
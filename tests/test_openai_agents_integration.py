@@ -1,12 +1,82 @@
 """Tests for OpenAI Agents integration"""
 
+import asyncio
+import logging
+
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from types import SimpleNamespace
+from unittest.mock import Mock, call
 from monkai_trace.integrations.openai_agents import MonkAIRunHooks
 from monkai_trace.models import Message, Transfer
 
+_HOOKS_LOGGER = "monkai_trace.integrations.openai_agents"
+
+
+class _UploadSink:
+    """Async client stand-in that keeps uploaded batches in memory"""
+    
+    def __init__(self, error=None, **settings):
+        self.error = error
+        self.settings = settings
+        self.batches = []
+        self.closed = 0
+    
+    async def upload_records_batch(self, records, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.batches.append(list(records))
+        return {"total_inserted": len(records), "failures": []}
+    
+    async def close(self):
+        self.closed += 1
+
+
+@pytest.fixture
+def upload_clients(monkeypatch):
+    """Upload clients built by the shared upload queues, one sink per client"""
+    from monkai_trace.integrations import openai_agents
+    
+    clients = []
+    
+    def make_client(**kwargs):
+        clients.append(_UploadSink(**kwargs))
+        return clients[-1]
+    
+    monkeypatch.setattr(openai_agents, "AsyncMonkAIClient", make_client)
+    return clients
+
+
+@pytest.fixture
+def upload_sink(monkeypatch):
+    """A single sink standing in for every upload client the queues build"""
+    from monkai_trace.integrations import openai_agents
+    
+    sink = _UploadSink()
+    monkeypatch.setattr(openai_agents, "AsyncMonkAIClient", lambda **kwargs: sink)
+    return sink
+
+
+@pytest.fixture
+def hooks(mock_client):
+    """Hooks without auto-upload, the setup most hook tests share"""
+    return MonkAIRunHooks(
+        tracer_token="tk_test",
+        namespace="test",
+        auto_upload=False,
+        client=mock_client
+    )
+
+
+@pytest.fixture(autouse=True)
+def _no_orphans_from_earlier_tests():
+    """Collect hooks left over by earlier tests and drop the records they orphaned"""
+    import gc
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    
+    gc.collect()
+    _UploadQueue._orphans.clear()
+
 
-@pytest.mark.asyncio
 async def test_hooks_initialization():
     """Test MonkAIRunHooks initialization"""
     hooks = MonkAIRunHooks(
@@ -20,7 +90,27 @@ async def test_hooks_initialization():
     assert hooks.batch_size == 10
 
 
-@pytest.mark.asyncio
+def test_hooks_state_lives_in_slots():
+    """Test instance attributes are slotted, leaving the inherited __dict__ empty"""
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test")
+    
+    assert hooks.__dict__ == {}
+
+
+def test_get_or_create_shares_hooks_per_token_and_namespace():
+    """Test get_or_create returns one instance per (token, namespace) until the cache is cleared"""
+    try:
+        hooks = MonkAIRunHooks.get_or_create("tk_test", "test", batch_size=5)
+        assert MonkAIRunHooks.get_or_create("tk_test", "test") is hooks
+        assert hooks.batch_size == 5
+        assert MonkAIRunHooks.get_or_create("tk_test", "other") is not hooks
+        
+        MonkAIRunHooks.clear_cache()
+        assert MonkAIRunHooks.get_or_create("tk_test", "test") is not hooks
+    finally:
+        MonkAIRunHooks.clear_cache()
+
+
 async def test_on_agent_start(mock_context, mock_agent):
     """Test on_agent_start hook"""
     hooks = MonkAIRunHooks(
@@ -39,46 +129,135 @@ async def test_on_agent_start(mock_context, mock_agent):
     assert hooks._system_prompt_tokens > 0
 
 
-@pytest.mark.asyncio
-async def test_on_agent_end(mock_context, mock_agent):
+async def test_session_resolved_once_per_conversation(mock_context, mock_agent, mock_output, hooks):
+    """Test agents started after a handoff reuse the conversation's session"""
+    hooks.session_manager = Mock(inactivity_timeout=120)
+    hooks.session_manager.get_or_create_session.side_effect = ["session-1", "session-2"]
+    
+    await hooks.on_agent_start(mock_context, mock_agent)
+    await hooks.on_agent_start(mock_context, mock_agent)
+    assert hooks._current_session == "session-1"
+    hooks.session_manager.get_or_create_session.assert_called_once()
+    hooks.session_manager.update_activity.assert_called_once()
+    
+    await hooks.on_agent_end(mock_context, mock_agent, mock_output())
+    await hooks.on_agent_start(mock_context, mock_agent)
+    assert hooks._current_session == "session-2"
+
+
+async def test_prompt_token_estimate_cached(mock_context, mock_agent, hooks):
+    """Test instructions estimate is cached and dynamic instructions are skipped"""
+    from monkai_trace.integrations.openai_agents import _count_tokens
+    
+    await hooks.on_agent_start(mock_context, mock_agent)
+    expected = _count_tokens(mock_agent.instructions)
+    assert hooks._system_prompt_tokens == expected
+    assert MonkAIRunHooks._prompt_token_cache[(id(mock_agent.instructions), None)] == (
+        mock_agent.instructions, expected
+    )
+    
+    hooks._system_prompt_tokens = 0
+    mock_agent.instructions = lambda ctx, agent: "dynamic"
+    await hooks.on_agent_start(mock_context, mock_agent)
+    assert hooks._system_prompt_tokens == 0
+
+
+def test_count_tokens_uses_tiktoken_encoding_per_model(monkeypatch):
+    """Test exact counts come from the model's encoding, unknown models use the default one"""
+    from monkai_trace.integrations import openai_agents
+    
+    class FakeEncoding:
+        def __init__(self, name):
+            self.name = name
+        
+        def encode_ordinary(self, text):
+            return text.split()
+    
+    def encoding_for_model(model):
+        if model != "gpt-4o":
+            raise KeyError(model)
+        return FakeEncoding("o200k_base")
+    
+    fake = Mock(encoding_for_model=Mock(side_effect=encoding_for_model), get_encoding=FakeEncoding)
+    monkeypatch.setattr(openai_agents, "tiktoken", fake)
+    monkeypatch.setattr(openai_agents, "_encodings", {})
+    
+    assert openai_agents._count_tokens("one two three", "gpt-4o") == 3
+    assert openai_agents._count_tokens("one two three", "gpt-4o") == 3
+    assert openai_agents._count_tokens("four words right here", "my-finetune") == 4
+    fake.encoding_for_model.assert_has_calls([call("gpt-4o"), call("my-finetune")])
+    assert fake.encoding_for_model.call_count == 2
+
+
+async def test_on_agent_end(mock_context, mock_agent, mock_output, mock_client):
     """Test on_agent_end hook"""
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
         namespace="test",
-        auto_upload=False
+        auto_upload=False,
+        client=mock_client
     )
     
-    # Mock the client upload
-    hooks.client.upload_records_batch = Mock(return_value={"total_inserted": 1})
-    
     # Start agent first
     await hooks.on_agent_start(mock_context, mock_agent)
     
-    # Create a mock output that won't cause iteration issues
-    mock_output = Mock(spec=[])  # Empty spec prevents __iter__
-    mock_output.final_output = "Test output"
-    mock_output.raw_items = None
-    mock_output.new_items = None
-    mock_output.items = None
-    mock_output.output = None
+    output = mock_output()
     
     # End agent
-    await hooks.on_agent_end(mock_context, mock_agent, mock_output)
+    await hooks.on_agent_end(mock_context, mock_agent, output)
     
     # Messages are cleared after on_agent_end (record was built)
     # Verify the agent end was processed by checking the session exists
     assert hooks._current_session is not None
 
 
-@pytest.mark.asyncio
-async def test_on_handoff(mock_context):
-    """Test on_handoff hook"""
+async def test_on_agent_end_single_user_and_assistant(mock_context, mock_agent):
+    """Test role tracking avoids duplicate user/assistant messages"""
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
         namespace="test",
-        auto_upload=False
+        batch_size=100
     )
     
+    await hooks.on_agent_start(mock_context, mock_agent)
+    await hooks.on_llm_start(mock_context, mock_agent, "instructions", "Test user input")
+    await hooks.on_agent_end(mock_context, mock_agent, "Final answer")
+    
+    roles = [m.role for m in hooks._batch_buffer[0].msg]
+    assert roles == ["user", "assistant"]
+    assert hooks._roles_present == 0
+
+
+async def test_on_agent_end_without_usage(mock_context, mock_agent):
+    """Test a missing context.usage records zero input/output tokens"""
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test", batch_size=100)
+    mock_context.usage = None
+    
+    await hooks.on_agent_start(mock_context, mock_agent)
+    await hooks.on_agent_end(mock_context, mock_agent, "Final answer")
+    
+    record = hooks._batch_buffer.pop()
+    assert (record.input_tokens, record.output_tokens) == (0, 0)
+    assert record.total_tokens == record.process_tokens
+
+
+async def test_on_llm_start_extracts_user_from_input_list(mock_context, mock_agent):
+    """Test user content is found among mixed input item types"""
+    for item in (
+        {"role": "user", "content": "from dict"},
+        Message(role="user", content="from dict"),
+        Mock(role="user", content="from dict"),
+    ):
+        hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test")
+        input_data = ["raw", {"role": "system", "content": "sys"}, Message(role="assistant", content="hi"), item]
+        await hooks.on_llm_start(mock_context, mock_agent, "instructions", input_data)
+        assert hooks._user_input == "from dict"
+        assert hooks._messages[0].content == "from dict"
+
+
+async def test_on_handoff(mock_context, hooks):
+    """Test on_handoff hook"""
+    
     agent_a = Mock()
     agent_a.name = "Agent A"
     
@@ -101,15 +280,18 @@ async def test_on_handoff(mock_context):
     assert hooks._messages[0].tool_calls[0]["arguments"]["to_agent"] == "Agent B"
 
 
-@pytest.mark.asyncio
-async def test_on_tool_start_and_end(mock_context, mock_agent):
-    """Test on_tool_start and on_tool_end hooks"""
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        auto_upload=False
-    )
+def test_fast_iso_matches_isoformat():
+    """Test cached-prefix timestamps match datetime.isoformat()"""
+    from datetime import datetime, timedelta
+    from monkai_trace.integrations.openai_agents import _fast_iso
     
+    for ts_ns in (0, 1_700_000_059_999_999_000, 1_700_000_060_000_001_000):
+        expected = datetime(1970, 1, 1) + timedelta(microseconds=ts_ns // 1000)
+        assert _fast_iso(ts_ns) == expected.isoformat(timespec="microseconds")
+
+
+async def test_on_tool_start_and_end(mock_context, mock_agent, hooks):
+    """Test on_tool_start and on_tool_end hooks"""
     tool = Mock()
     tool.name = "search_tool"
     
@@ -128,8 +310,62 @@ async def test_on_tool_start_and_end(mock_context, mock_agent):
     assert hooks._messages[1].content == "Search results"
 
 
-@pytest.mark.asyncio
-async def test_batch_upload_threshold(mock_context, mock_agent):
+async def test_repeated_tool_calls_share_label_strings(mock_context, mock_agent, hooks):
+    """Test tool-start messages reuse one content string per tool"""
+    tool = Mock()
+    tool.name = "".join(["search", "_tool"])  # a fresh, non-literal string
+    
+    await hooks.on_tool_start(mock_context, mock_agent, tool)
+    await hooks.on_tool_start(mock_context, mock_agent, tool)
+    
+    first, second = hooks._messages
+    assert first.content == "Calling tool: search_tool"
+    assert first.content is second.content
+
+
+async def test_dedupe_tool_results_references_first_identical_result(mock_context, mock_agent):
+    """Test repeated identical tool results are replaced by a reference when enabled"""
+    hooks = MonkAIRunHooks(
+        tracer_token="tk_test", namespace="test", auto_upload=False, dedupe_tool_results=True
+    )
+    search = Mock()
+    search.name = "web_search"
+    other = Mock()
+    other.name = "file_search"
+    payload = "result " * 20
+    
+    await hooks.on_tool_end(mock_context, mock_agent, search, payload)
+    await hooks.on_tool_end(mock_context, mock_agent, search, "short")
+    await hooks.on_tool_end(mock_context, mock_agent, search, payload)
+    await hooks.on_tool_end(mock_context, mock_agent, other, payload)
+    
+    contents = [m.content for m in hooks._messages]
+    assert contents == [payload, "short", "[duplicate of tool result #1]", payload]
+
+
+async def test_dedupe_transfers_folds_repeated_handoffs(mock_context):
+    """Test repeated handoffs between the same agents become one counted transfer when enabled"""
+    hooks = MonkAIRunHooks(
+        tracer_token="tk_test", namespace="test", auto_upload=False, dedupe_transfers=True
+    )
+    agent_a = Mock()
+    agent_a.name = "Agent A"
+    agent_b = Mock()
+    agent_b.name = "Agent B"
+    
+    await hooks.on_handoff(mock_context, agent_a, agent_b)
+    await hooks.on_handoff(mock_context, agent_b, agent_a)
+    await hooks.on_handoff(mock_context, agent_a, agent_b)
+    
+    assert [(t.from_agent, t.to_agent, t.count) for t in hooks._transfers] == [
+        ("Agent A", "Agent B", 2),
+        ("Agent B", "Agent A", 1),
+    ]
+    assert hooks._transfers[0].timestamp == hooks._messages[2].tool_calls[0]["arguments"]["timestamp"]
+    assert len(hooks._messages) == 3
+
+
+async def test_batch_upload_threshold(mock_context, mock_agent, mock_output, upload_sink):
     """Test batch upload when threshold is reached"""
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
@@ -138,23 +374,8 @@ async def test_batch_upload_threshold(mock_context, mock_agent):
         batch_size=2
     )
     
-    # Mock the client upload
-    hooks.client.upload_records_batch = Mock(return_value={"total_inserted": 2})
-    
-    # Create mock outputs with spec=[] to prevent __iter__
-    mock_output1 = Mock(spec=[])
-    mock_output1.final_output = "Output 1"
-    mock_output1.raw_items = None
-    mock_output1.new_items = None
-    mock_output1.items = None
-    mock_output1.output = None
-    
-    mock_output2 = Mock(spec=[])
-    mock_output2.final_output = "Output 2"
-    mock_output2.raw_items = None
-    mock_output2.new_items = None
-    mock_output2.items = None
-    mock_output2.output = None
+    mock_output1 = mock_output("Output 1")
+    mock_output2 = mock_output("Output 2")
     
     # Process first agent
     await hooks.on_agent_start(mock_context, mock_agent)
@@ -167,40 +388,236 @@ async def test_batch_upload_threshold(mock_context, mock_agent):
     await hooks.on_agent_start(mock_context, mock_agent)
     await hooks.on_agent_end(mock_context, mock_agent, mock_output2)
     
-    # Should have triggered upload and cleared buffer
-    hooks.client.upload_records_batch.assert_called_once()
+    # Should have handed the records to the upload queue
+    assert len(hooks._batch_buffer) == 0
+    
+    await hooks.flush()
+    assert [len(batch) for batch in upload_sink.batches] == [2]
+
+
+async def test_upload_queue_coalesces_hooks_instances(mock_context, mock_agent, mock_output, upload_sink):
+    """Test records from hooks sharing a token go out in a single upload"""
+    hooks_a = MonkAIRunHooks(tracer_token="tk_test", namespace="a", batch_size=1)
+    hooks_b = MonkAIRunHooks(tracer_token="tk_test", namespace="b", batch_size=1)
+    
+    output = mock_output()
+    for hooks in (hooks_a, hooks_b):
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await hooks.on_agent_end(mock_context, mock_agent, output)
+    
+    await hooks_a.flush()
+    
+    assert len(upload_sink.batches) == 1
+    assert {r.namespace for r in upload_sink.batches[0]} == {"a", "b"}
 
 
-@pytest.mark.asyncio
-async def test_token_segmentation(mock_context, mock_agent, capsys):
+async def test_async_with_closes_hooks(upload_sink):
+    """Test leaving an async with block flushes and closes the hooks"""
+    async with MonkAIRunHooks(tracer_token="tk_test", namespace="test", auto_upload=False) as hooks:
+        hooks._batch_buffer.append(Mock())
+    
+    assert len(upload_sink.batches) == 1
+    assert upload_sink.closed == 1
+
+
+async def test_closing_one_hooks_keeps_shared_upload_client_open(
+    mock_context, mock_agent, mock_output, upload_clients
+):
+    """Test closing one hooks instance leaves the queue's client open for the others"""
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    
+    hooks_a = MonkAIRunHooks(tracer_token="tk_test", namespace="a", batch_size=1)
+    hooks_b = MonkAIRunHooks(tracer_token="tk_test", namespace="b", batch_size=1)
+    output = mock_output()
+    for hooks in (hooks_a, hooks_b):
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await hooks.on_agent_end(mock_context, mock_agent, output)
+    
+    await hooks_a.aclose()
+    assert [client.closed for client in upload_clients] == [0]
+    
+    await hooks_b.on_agent_start(mock_context, mock_agent)
+    await hooks_b.on_agent_end(mock_context, mock_agent, output)
+    await hooks_b.flush()
+    
+    client, = upload_clients
+    assert [len(batch) for batch in client.batches] == [2, 1]
+    assert client.closed == 0
+    
+    await hooks_b.aclose()
+    assert client.closed == 1
+    assert _UploadQueue.lookup(hooks_b._upload_key) is None
+
+
+async def test_upload_client_uses_sync_client_settings(upload_clients):
+    """Test uploads go through a client configured like the hooks' MonkAIClient"""
+    from monkai_trace.client import MonkAIClient
+    
+    rules = Mock()
+    custom = MonkAIClient(
+        tracer_token="tk_test", base_url="https://eu.example.com", timeout=5,
+        strict_dedup=True, rules_client=rules, compress_uploads=True, anonymizer_cache_size=0
+    )
+    hooks_custom = MonkAIRunHooks(tracer_token="tk_test", namespace="a", client=custom)
+    hooks_default = MonkAIRunHooks(tracer_token="tk_test", namespace="b")
+    for hooks in (hooks_custom, hooks_default):
+        hooks._batch_buffer.append(Mock())
+        await hooks.aclose()
+    
+    custom_client, default_client = upload_clients
+    assert custom_client.settings == {
+        "tracer_token": "tk_test", "base_url": "https://eu.example.com", "timeout": 5,
+        "max_retries": 3, "strict_dedup": True, "rules_client": rules,
+        "compress_uploads": True, "anonymizer_cache_size": 0,
+    }
+    assert default_client.settings["base_url"] == MonkAIClient.BASE_URL
+    assert default_client.settings["rules_client"] is None
+    assert [len(c.batches) for c in upload_clients] == [1, 1]
+
+
+def test_collected_hooks_orphan_buffered_records():
+    """Test records buffered by a garbage-collected hooks instance are kept for upload"""
+    import gc
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    
+    hooks = MonkAIRunHooks(tracer_token="tk_collected", namespace="test", auto_upload=False)
+    key = hooks._upload_key
+    record = Mock()
+    hooks._batch_buffer.append(record)
+    del hooks
+    gc.collect()
+    
+    assert _UploadQueue._orphans.pop(key) == [record]
+
+
+async def test_flush_failure_is_tracked(hooks, upload_sink):
+    """Test failed uploads are recorded on the upload queue"""
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    
+    upload_sink.error = Exception("offline")
+    hooks._batch_buffer.append(Mock())
+    
+    await hooks.flush()
+    queue = _UploadQueue.lookup(hooks._upload_key)
+    await hooks.aclose()
+    
+    assert len(hooks._batch_buffer) == 0
+    assert queue.failures == [{"records": 1, "error": "offline"}]
+    assert upload_sink.closed == 1
+
+
+async def test_buffered_records_share_model_name(mock_context, mock_agent):
+    """Test records built from a model object reuse one interned model name"""
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test", batch_size=100)
+    mock_agent.model = type("Model", (), {"__str__": lambda self: "".join(["gpt-", "4o"])})()
+    
+    for _ in range(2):
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await hooks.on_agent_end(mock_context, mock_agent, "answer")
+    
+    first, second = hooks._batch_buffer
+    assert first.model == "gpt-4o"
+    assert first.model is second.model
+    hooks._batch_buffer.clear()
+
+
+async def test_batch_buffer_drops_oldest_when_full(mock_context, mock_agent):
+    """Test the batch buffer is bounded and counts dropped records"""
+    hooks = MonkAIRunHooks(
+        tracer_token="tk_test",
+        namespace="test",
+        batch_size=100,
+        max_buffer=2
+    )
+    hooks._skip_auto_flush = True
+    
+    for _ in range(3):
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await hooks.on_agent_end(mock_context, mock_agent, "answer")
+    
+    assert len(hooks._batch_buffer) == 2
+    assert hooks._dropped_count == 1
+    hooks._batch_buffer.clear()
+
+
+async def test_upload_queue_drops_oldest_when_full():
+    """Test the shared upload queue stays bounded while uploads are stalled"""
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    
+    queue = _UploadQueue(Mock(), "tk_bounded", max_pending=2)
+    first, second, third = Mock(), Mock(), Mock()
+    for record in (first, second, third):
+        queue.put(record)
+    queue._task.cancel()
+    
+    assert queue.dropped_count == 1
+    assert [queue._queue.get_nowait() for _ in range(2)] == [second, third]
+    _UploadQueue._orphans.pop(queue.key, None)
+
+
+async def test_upload_queue_caps_batches_by_estimated_bytes(upload_sink):
+    """Test large records are uploaded in byte-bounded batches without waiting for the interval"""
+    from monkai_trace.integrations.openai_agents import _UploadQueue
+    from monkai_trace.models import ConversationRecord
+    
+    queue = _UploadQueue(upload_sink, "tk_bytes", flush_interval=60, max_batch_bytes=4096)
+    records = [
+        ConversationRecord(namespace="test", agent="bot", msg=[Message(role="user", content="x" * 1500)])
+        for _ in range(4)
+    ]
+    for record in records:
+        queue.put(record)
+    
+    await asyncio.wait_for(queue._queue.join(), 5)
+    assert upload_sink.batches == [records[:2], records[2:]]
+    assert queue._pending_bytes == 0
+    queue._task.cancel()
+
+
+def test_records_left_in_queue_are_drained_at_exit(mock_context, mock_agent, upload_sink):
+    """Test records queued when the loop ends are uploaded by the exit drain"""
+    import asyncio
+    from monkai_trace.integrations.openai_agents import _drain_at_exit
+    
+    sink = upload_sink
+    hooks = MonkAIRunHooks(tracer_token="tk_drain", namespace="test", batch_size=1)
+    
+    async def run():
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await hooks.on_agent_end(mock_context, mock_agent, "Final answer")
+    
+    # The loop closes before the queue's coalescing delay elapses
+    asyncio.run(run())
+    assert sink.batches == []
+    
+    _drain_at_exit()
+    assert len(sink.batches) == 1
+    assert sink.closed == 1
+
+
+async def test_token_segmentation(mock_context, mock_agent, mock_output):
     """Test that all 4 token types are captured"""
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
         namespace="test",
-        auto_upload=False,
         estimate_system_tokens=True
     )
     
-    # Create mock output with spec=[] to prevent __iter__
-    mock_output = Mock(spec=[])
-    mock_output.final_output = "Test output"
-    mock_output.raw_items = None
-    mock_output.new_items = None
-    mock_output.items = None
-    mock_output.output = None
-    
     await hooks.on_agent_start(mock_context, mock_agent)
-    await hooks.on_agent_end(mock_context, mock_agent, mock_output)
+    await hooks.on_agent_end(mock_context, mock_agent, mock_output())
     
-    # Verify token tracking occurred via stdout
-    captured = capsys.readouterr()
-    assert "Tracked" in captured.out and "tokens" in captured.out
-    # Should show 30 tokens (10 input + 20 output)
-    assert "30 tokens" in captured.out
+    # Below batch_size, so the record is still buffered
+    record = hooks._batch_buffer.pop()
+    process_tokens = hooks._estimate_prompt_tokens(mock_agent.instructions)
+    assert process_tokens > 0
+    assert record.input_tokens == 10
+    assert record.output_tokens == 20
+    assert record.process_tokens == process_tokens
+    assert record.memory_tokens == 0
+    assert record.total_tokens == 30 + process_tokens
 
 
-@pytest.mark.asyncio
-async def test_session_continuity(mock_context, mock_agent):
+async def test_session_continuity(mock_context, mock_agent, mock_output):
     """Test session ID remains consistent within timeout for same user"""
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
@@ -209,20 +626,8 @@ async def test_session_continuity(mock_context, mock_agent):
         inactivity_timeout=60  # 60 seconds timeout
     )
     
-    # Create mock outputs with spec=[] to prevent __iter__
-    mock_output1 = Mock(spec=[])
-    mock_output1.final_output = "Output 1"
-    mock_output1.raw_items = None
-    mock_output1.new_items = None
-    mock_output1.items = None
-    mock_output1.output = None
-    
-    mock_output2 = Mock(spec=[])
-    mock_output2.final_output = "Output 2"
-    mock_output2.raw_items = None
-    mock_output2.new_items = None
-    mock_output2.items = None
-    mock_output2.output = None
+    mock_output1 = mock_output("Output 1")
+    mock_output2 = mock_output("Output 2")
     
     # First run
     await hooks.on_agent_start(mock_context, mock_agent)
@@ -238,23 +643,10 @@ async def test_session_continuity(mock_context, mock_agent):
     assert first_session == second_session
 
 
-@pytest.mark.asyncio
-async def test_capture_user_message_from_context_input(mock_agent):
+async def test_capture_user_message_from_context_input(mock_agent, make_context, hooks):
     """Test user message capture from context.input"""
-    mock_context = Mock()
-    mock_context.input = "Hello from context.input"
-    usage = Mock()
-    usage.input_tokens = 10
-    usage.output_tokens = 20
-    usage.total_tokens = 30
-    usage.requests = 1
-    mock_context.usage = usage
+    mock_context = make_context(input="Hello from context.input")
     
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        auto_upload=False
-    )
     await hooks.on_agent_start(mock_context, mock_agent)
     
     assert len(hooks._messages) == 1
@@ -262,8 +654,23 @@ async def test_capture_user_message_from_context_input(mock_agent):
     assert hooks._messages[0].content == "Hello from context.input"
 
 
-@pytest.mark.asyncio
-async def test_capture_user_message_from_context_messages(mock_agent):
+async def test_context_input_read_per_instance_of_dynamic_class(mock_agent, hooks):
+    """Test contexts of one class with different attribute sets are each read correctly"""
+    from monkai_trace.integrations.openai_agents import _context_user_input, _input_resolvers
+    
+    user_msg = SimpleNamespace(role="user", content="Hi from messages")
+    
+    assert _context_user_input(SimpleNamespace(context=None)) is None
+    assert _context_user_input(SimpleNamespace(input="hi", context=None)) == "hi"
+    assert _context_user_input(SimpleNamespace(messages=[user_msg])) == "Hi from messages"
+    assert _context_user_input(SimpleNamespace(context=SimpleNamespace(input="nested"))) == "nested"
+    
+    await hooks.on_agent_start(SimpleNamespace(input="hi"), mock_agent)
+    assert hooks._messages[0].content == "hi"
+    assert len(_input_resolvers[SimpleNamespace]) == 3
+
+
+async def test_capture_user_message_from_context_messages(mock_agent, hooks):
     """Test user message capture from context.messages"""
     user_msg = Mock()
     user_msg.role = "user"
@@ -279,11 +686,6 @@ async def test_capture_user_message_from_context_messages(mock_agent):
     usage.requests = 1
     mock_context.usage = usage
     
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        auto_upload=False
-    )
     await hooks.on_agent_start(mock_context, mock_agent)
     
     assert len(hooks._messages) == 1
@@ -291,8 +693,20 @@ async def test_capture_user_message_from_context_messages(mock_agent):
     assert "Hello from context.messages" in hooks._messages[0].content
 
 
-@pytest.mark.asyncio
-async def test_set_user_input_priority(mock_agent):
+async def test_capture_user_message_from_nested_run_context(mock_agent, hooks):
+    """Test a real RunContextWrapper is probed once and read from its nested context"""
+    from types import SimpleNamespace
+    from agents.run_context import RunContextWrapper
+    from monkai_trace.integrations.openai_agents import _input_resolvers
+    
+    for text in ("First question", "Second question"):
+        context = RunContextWrapper(context=SimpleNamespace(input=text))
+        await hooks.on_agent_start(context, mock_agent)
+        assert hooks._messages[-1].content == text
+    
+    assert [fn.__name__ for fn in _input_resolvers[RunContextWrapper]] == ["_nested_source"]
+
+async def test_set_user_input_priority(mock_agent, hooks):
     """Test that set_user_input() takes priority over context"""
     mock_context = Mock()
     mock_context.input = "From context"
@@ -303,11 +717,6 @@ async def test_set_user_input_priority(mock_agent):
     usage.requests = 1
     mock_context.usage = usage
     
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        auto_upload=False
-    )
     hooks.set_user_input("From set_user_input")
     await hooks.on_agent_start(mock_context, mock_agent)
     
@@ -315,8 +724,7 @@ async def test_set_user_input_priority(mock_agent):
     assert hooks._messages[0].content == "From set_user_input"
 
 
-@pytest.mark.asyncio
-async def test_warning_when_no_user_message(mock_agent, capsys):
+async def test_warning_when_no_user_message(mock_agent, caplog, hooks):
     """Test warning is logged when no user message is captured"""
     from unittest.mock import MagicMock
     
@@ -335,150 +743,157 @@ async def test_warning_when_no_user_message(mock_agent, capsys):
     usage.requests = 1
     mock_context.usage = usage
     
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        auto_upload=False
-    )
+    caplog.set_level(logging.WARNING, logger=_HOOKS_LOGGER)
     await hooks.on_agent_start(mock_context, mock_agent)
     
-    # Check that warning was printed (message capture may vary based on implementation)
-    captured = capsys.readouterr()
-    # Either no messages captured OR warning was shown
-    assert len(hooks._messages) == 0 or "WARNING" in captured.out or "No user message" in captured.out
+    assert len(hooks._messages) == 0
+    assert any("No user message" in r.getMessage() for r in caplog.records)
 
 
-@pytest.mark.asyncio
-async def test_session_timeout_creates_new_session(mock_agent):
-    """Test that inactive sessions get new session_id"""
-    import time
-    
-    # Create custom context without mock user_id
-    context = Mock()
-    context.input = "Test input"
-    context.messages = None
-    context.user_id = None
-    context.response = None
-    usage = Mock()
-    usage.input_tokens = 10
-    usage.output_tokens = 20
-    usage.total_tokens = 30
-    usage.requests = 1
-    context.usage = usage
+@pytest.mark.parametrize("timeout,action,expect_same", [
+    (60, "noop", True),            # Sessão continua dentro do timeout
+    (1, "advance_clock", False),   # Sessão inativa recebe novo session_id
+    (60, "change_user", False),    # Usuários diferentes, sessões diferentes
+])
+async def test_session_behavior(mock_agent, make_context, fake_clock, timeout, action, expect_same):
+    """Test when a second agent start reuses the first one's session"""
+    context = make_context()
     
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
         namespace="test",
-        inactivity_timeout=1,  # 1 segundo
+        inactivity_timeout=timeout,
         auto_upload=False
     )
-    hooks.set_user_id("user123")
+    hooks._now = hooks.session_manager._now = fake_clock
+    hooks.set_user_id("user1")
     
-    # Primera interação
+    # Primeira interação
     await hooks.on_agent_start(context, mock_agent)
     session1 = hooks._current_session
     
-    time.sleep(2)  # Esperar timeout
+    if action == "advance_clock":
+        fake_clock.advance(2)  # Esperar timeout
+    elif action == "change_user":
+        hooks.set_user_id("user2")
     
-    # Segunda interação (nova sessão)
+    # Segunda interação
     await hooks.on_agent_start(context, mock_agent)
     session2 = hooks._current_session
     
-    assert session1 != session2
-    assert "user123" in session1
-    assert "user123" in session2
+    assert (session1 == session2) is expect_same
+    assert "user1" in session1
+    assert ("user2" if action == "change_user" else "user1") in session2
 
 
-@pytest.mark.asyncio
-async def test_session_continues_within_timeout(mock_agent):
-    """Test that sessions continue within timeout"""
-    # Create custom context without mock user_id
-    context = Mock()
-    context.input = "Test input"
-    context.messages = None
-    context.user_id = None
-    context.response = None
-    usage = Mock()
-    usage.input_tokens = 10
-    usage.output_tokens = 20
-    usage.total_tokens = 30
-    usage.requests = 1
-    context.usage = usage
-    
-    hooks = MonkAIRunHooks(
-        tracer_token="tk_test",
-        namespace="test",
-        inactivity_timeout=60,  # 60 segundos
-        auto_upload=False
-    )
-    hooks.set_user_id("user123")
-    
-    # Primera interação
-    await hooks.on_agent_start(context, mock_agent)
-    session1 = hooks._current_session
-    
-    # Segunda interação (dentro do timeout)
-    await hooks.on_agent_start(context, mock_agent)
-    session2 = hooks._current_session
+async def test_interleaved_users_keep_separate_conversations(mock_agent, make_context):
+    """Test one hooks instance tracks concurrent users independently"""
+    def user_context(user_id):
+        return make_context(input=f"Hi from {user_id}", user_id=user_id)
     
-    # Deve ser a mesma sessão
-    assert session1 == session2
-
-
-@pytest.mark.asyncio
-async def test_multi_user_sessions(mock_agent):
-    """Test that different users get different sessions"""
-    # Create custom context without mock user_id
-    context = Mock()
-    context.input = "Test input"
-    context.messages = None
-    context.user_id = None
-    context.response = None
-    usage = Mock()
-    usage.input_tokens = 10
-    usage.output_tokens = 20
-    usage.total_tokens = 30
-    usage.requests = 1
-    context.usage = usage
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test", batch_size=100)
+    tool = Mock()
+    tool.name = "search_tool"
+    ctx_a, ctx_b = user_context("user-a"), user_context("user-b")
+    
+    await hooks.on_agent_start(ctx_a, mock_agent)
+    await hooks.on_agent_start(ctx_b, mock_agent)
+    await hooks.on_tool_start(ctx_a, mock_agent, tool)
+    await hooks.on_agent_end(ctx_b, mock_agent, "Answer for b")
+    await hooks.on_agent_end(ctx_a, mock_agent, "Answer for a")
+    
+    record_b, record_a = hooks._batch_buffer
+    assert [m.content for m in record_b.msg] == ["Hi from user-b", "Answer for b"]
+    assert [m.role for m in record_a.msg] == ["user", "tool", "assistant"]
+    assert "user-a" in record_a.session_id
+    assert "user-b" in record_b.session_id
+    assert hooks._sessions == {}
+    hooks._batch_buffer.clear()
+
+
+async def test_set_user_id_is_scoped_to_the_task(mock_context, mock_agent):
+    """Test concurrent tasks sharing one hooks instance each keep their user_id, name and channel"""
+    import asyncio
+    
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test", batch_size=100)
+    
+    async def handle(user_id):
+        hooks.set_user_id(user_id)
+        hooks.set_user_name(f"Name {user_id}")
+        hooks.set_user_channel(f"channel-{user_id}")
+        await asyncio.sleep(0)  # let the other task set its user first
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await asyncio.sleep(0)
+        await hooks.on_agent_end(mock_context, mock_agent, f"Answer for {user_id}")
+    
+    await asyncio.gather(handle("user-a"), handle("user-b"))
+    
+    by_user = {r.external_user_id: r for r in hooks._batch_buffer}
+    assert set(by_user) == {"user-a", "user-b"}
+    for user_id, record in by_user.items():
+        assert user_id in record.session_id
+        assert record.external_user_name == f"Name {user_id}"
+        assert record.external_user_channel == f"channel-{user_id}"
+        assert record.msg[-1].content == f"Answer for {user_id}"
+    hooks._batch_buffer.clear()
+
+
+async def test_task_without_set_user_id_stays_anonymous(mock_context, mock_agent):
+    """Test a task that never set a user doesn't record another task's user"""
+    import asyncio
+    
+    hooks = MonkAIRunHooks(tracer_token="tk_test", namespace="test", batch_size=100)
+    
+    async def handle(user_id):
+        if user_id:
+            hooks.set_user_id(user_id)
+            hooks.set_user_name(f"Name {user_id}")
+            hooks.set_user_channel("whatsapp")
+        await asyncio.sleep(0)  # let the other task set its user first
+        await hooks.on_agent_start(mock_context, mock_agent)
+        await asyncio.sleep(0)
+        await hooks.on_agent_end(mock_context, mock_agent, f"Answer for {user_id}")
+    
+    await asyncio.gather(handle("user-a"), handle(None))
+    
+    by_user = {r.external_user_id: r for r in hooks._batch_buffer}
+    assert set(by_user) == {"user-a", None}
+    anonymous = by_user[None]
+    assert "anonymous" in anonymous.session_id
+    assert anonymous.external_user_name is None
+    assert anonymous.external_user_channel is None
+    assert anonymous.msg[-1].content == "Answer for None"
+    hooks._batch_buffer.clear()
+
+
+async def test_persistent_session_lookup_runs_off_loop(mock_context, mock_agent):
+    """Test backend session lookups don't block the event loop thread"""
+    import threading
+    
+    lookup_threads = []
+    
+    def get_or_create_session(**kwargs):
+        lookup_threads.append(threading.current_thread())
+        return {"session_id": "test-anonymous-backend", "reused": False}
     
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
         namespace="test",
-        inactivity_timeout=60,
-        auto_upload=False
+        auto_upload=False,
+        persistent_sessions=True,
+        client=SimpleNamespace(get_or_create_session=get_or_create_session)
     )
     
-    # User 1
-    hooks.set_user_id("user1")
-    await hooks.on_agent_start(context, mock_agent)
-    session1 = hooks._current_session
-    
-    # User 2
-    hooks.set_user_id("user2")
-    await hooks.on_agent_start(context, mock_agent)
-    session2 = hooks._current_session
+    await hooks.on_agent_start(mock_context, mock_agent)
+    await hooks.aclose()
     
-    # Sessões diferentes
-    assert session1 != session2
-    assert "user1" in session1
-    assert "user2" in session2
-
+    assert hooks._current_session == "test-anonymous-backend"
+    assert lookup_threads and lookup_threads[0] is not threading.current_thread()
+    assert hooks._executor is None
 
-@pytest.mark.asyncio
-async def test_session_id_format(mock_agent):
+async def test_session_id_format(mock_agent, make_context):
     """Test session ID format"""
-    # Create custom context without mock user_id
-    context = Mock()
-    context.input = "Test input"
-    context.messages = None
-    context.user_id = None
-    context.response = None
-    usage = Mock()
-    usage.input_tokens = 10
-    usage.output_tokens = 20
-    usage.total_tokens = 30
-    usage.requests = 1
-    context.usage = usage
+    context = make_context()
     
     hooks = MonkAIRunHooks(
         tracer_token="tk_test",
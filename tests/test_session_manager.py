@@ -1,7 +1,6 @@
 """Tests for SessionManager"""
 
 import pytest
-import time
 from monkai_trace.session_manager import SessionManager
 
 
@@ -17,31 +16,44 @@ def test_session_creation():
     assert session1 == session2
 
 
-def test_session_timeout():
+def test_session_timeout(fake_clock):
     """Test session expires after timeout"""
     manager = SessionManager(inactivity_timeout=1)  # 1 segundo
+    manager._now = fake_clock
     
     session1 = manager.get_or_create_session("user1", "test-ns")
-    time.sleep(2)  # Esperar expirar
+    fake_clock.advance(2)  # Esperar expirar
     
     session2 = manager.get_or_create_session("user1", "test-ns")
     assert session1 != session2  # Nova sessão criada
 
 
-def test_activity_update():
+def test_activity_update(fake_clock):
     """Test activity update extends session"""
     manager = SessionManager(inactivity_timeout=2)
+    manager._now = fake_clock
     
     session1 = manager.get_or_create_session("user1", "test-ns")
-    time.sleep(1)
+    fake_clock.advance(1.5)
     manager.update_activity("user1")
-    time.sleep(1)
+    fake_clock.advance(1.5)
     
     # Ainda dentro do timeout devido ao update_activity
     session2 = manager.get_or_create_session("user1", "test-ns")
     assert session1 == session2
 
 
+def test_session_stamp_matches_strftime():
+    """Test cached-prefix session stamps match datetime.strftime() in local time"""
+    from datetime import datetime
+    from monkai_trace._clock import session_stamp
+    
+    for ts_ns in (0, 1_700_000_059_999_999_000, 1_700_000_060_000_001_000, 1_700_000_060_000_002_000):
+        seconds, micros = divmod(ts_ns // 1000, 1_000_000)
+        expected = datetime.fromtimestamp(seconds).replace(microsecond=micros).strftime('%Y%m%d-%H%M%S-%f')
+        assert session_stamp(ts_ns) == expected
+
+
 def test_force_new_session():
     """Test force_new parameter"""
     manager = SessionManager(inactivity_timeout=60)
@@ -76,22 +88,42 @@ def test_close_session():
     assert session1 != session2
 
 
-def test_cleanup_expired():
+def test_cleanup_expired(fake_clock):
     """Test automatic cleanup of expired sessions"""
     manager = SessionManager(inactivity_timeout=1)
+    manager._now = fake_clock
     
     # Create multiple sessions
     manager.get_or_create_session("user1", "test-ns")
     manager.get_or_create_session("user2", "test-ns")
     manager.get_or_create_session("user3", "test-ns")
     
-    time.sleep(2)  # Wait for expiration
+    fake_clock.advance(2)  # Wait for expiration
     
     # Cleanup should remove all expired sessions
     removed = manager.cleanup_expired()
     assert removed == 3
 
 
+def test_cleanup_keeps_sessions_touched_since_creation(fake_clock):
+    """Test cleanup only removes sessions that are still idle past the timeout"""
+    manager = SessionManager(inactivity_timeout=0.5, auto_cleanup_interval=0)
+    manager._now = fake_clock
+    
+    session1 = manager.get_or_create_session("user1", "test-ns")
+    manager.get_or_create_session("user2", "test-ns")
+    manager.get_or_create_session("user3", "test-ns")
+    manager.close_session("user3")
+    fake_clock.advance(0.3)
+    manager.update_activity("user1")
+    fake_clock.advance(0.3)
+    
+    assert manager.cleanup_expired() == 1
+    assert manager.get_session_info("user2") is None
+    assert manager.get_or_create_session("user1", "test-ns") == session1
+    assert manager.cleanup_expired() == 0
+
+
 def test_get_session_info():
     """Test session info retrieval"""
     manager = SessionManager(inactivity_timeout=60)
@@ -124,6 +156,26 @@ def test_session_id_format():
     assert len(timestamp_part) == 22  # YYYYMMDD-HHMMSS-ffffff
 
 
+def test_active_session_lookup_takes_no_lock():
+    """Test reusing an active session skips the lock; creating one takes it"""
+    manager = SessionManager(inactivity_timeout=60)
+    session1 = manager.get_or_create_session("user1", "test-ns")
+    
+    class NoLock:
+        def __enter__(self):
+            raise AssertionError("lock taken on the fast path")
+        
+        def __exit__(self, *exc_info):
+            return False
+    
+    manager._lock = NoLock()
+    assert manager.get_or_create_session("user1", "test-ns") == session1
+    manager.update_activity("user1")
+    
+    with pytest.raises(AssertionError):
+        manager.get_or_create_session("user2", "test-ns")
+
+
 # ==================== PersistentSessionManager Tests ====================
 
 class MockMonkAIClient:
@@ -207,7 +259,7 @@ def test_persistent_session_force_new():
     assert len(mock_client.calls) == 2  # Both hit backend
 
 
-def test_persistent_session_expired_cache_hits_backend():
+def test_persistent_session_expired_cache_hits_backend(fake_clock):
     """Test PersistentSessionManager queries backend when local cache expires"""
     from monkai_trace.session_manager import PersistentSessionManager
     
@@ -217,9 +269,10 @@ def test_persistent_session_expired_cache_hits_backend():
     ])
     
     manager = PersistentSessionManager(client=mock_client, inactivity_timeout=1)
+    manager._now = fake_clock
     
     session1 = manager.get_or_create_session("user1", "ns")
-    time.sleep(2)  # Wait for local cache to expire
+    fake_clock.advance(2)  # Wait for local cache to expire
     
     session2 = manager.get_or_create_session("user1", "ns")
     assert session2 == "ns-user1-session1"  # Backend returned same session